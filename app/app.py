@@ -1,44 +1,117 @@
 """FastAPI 应用入口"""
 
+import asyncio
 import logging
+import threading
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator
 
 import orjson
+import uvloop
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import Response
 from prometheus_fastapi_instrumentator import Instrumentator
 from openai import AsyncOpenAI
-from httpx import AsyncClient
+from httpx import AsyncClient, Limits, Timeout
 from sentence_transformers import SentenceTransformer
 
 from app.config import settings
 from app.scanner import RouterScanner
 from app.core.middlewares import RequestLoggingMiddleware
+from app.core.responses import (
+    ORJSON_OPTIONS,
+    SUCCESS_PREFIX,
+    SUCCESS_SUFFIX,
+    ORJSONResponse,
+    success_response,
+)
 from app.core.database import Base, async_engine
 from app.core.managers import async_job_manager
 
 logger = logging.getLogger(__name__)
 
 
+def _load_sentence_transformer(model_name: str, fp16: bool) -> SentenceTransformer:
+    """加载 Sentence Transformer 模型并预热，避免首个请求承担延迟初始化开销"""
+    model = SentenceTransformer(model_name)
+    # 半精度只在 GPU 上有收益，CPU 上保持 FP32
+    if fp16 and model.device.type == "cuda":
+        model.half()
+    model.encode(["warmup"], convert_to_numpy=True)
+    return model
+
+
+class _LazySentenceTransformer:
+    """首次使用时才加载的 Sentence Transformer 代理
+
+    encode 均在工作线程中调用，加载过程加锁，保证并发首调只加载一次
+    """
+
+    def __init__(self, model_name: str, fp16: bool):
+        self.model_name = model_name
+        self.fp16 = fp16
+        self._model: SentenceTransformer | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self) -> SentenceTransformer:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = _load_sentence_transformer(
+                        self.model_name, self.fp16
+                    )
+        return self._model
+
+    def encode(self, *args: Any, **kwargs: Any) -> Any:
+        return self.model.encode(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.model, name)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     """应用生命周期管理"""
     # 启动时执行
-    logger.info(f"Starting {settings.app_name} v{settings.app_version}")
+    logger.info("Starting %s v%s", settings.app_name, settings.app_version)
+
+    if settings.debug and not isinstance(asyncio.get_running_loop(), uvloop.Loop):
+        logger.warning("uvloop is not active, running on the default asyncio loop")
 
     # 初始化数据库表
     async with async_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
-    app.state.openai_client = AsyncOpenAI(
-        api_key=settings.openai_api_key, base_url=settings.openai_base_url
+    # 共享连接池，OpenAI 客户端与其他外部请求复用同一组长连接
+    app.state.httpx_client = AsyncClient(
+        http2=settings.http2,
+        limits=Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+        ),
+        timeout=Timeout(settings.http_timeout, connect=settings.http_connect_timeout),
     )
-    app.state.httpx_client = AsyncClient()
-    app.state.sentence_transformer = SentenceTransformer(
-        settings.sentence_transformer_model
+    app.state.openai_client = AsyncOpenAI(
+        api_key=settings.openai_api_key,
+        base_url=settings.openai_base_url,
+        max_retries=settings.openai_max_retries,
+        http_client=app.state.httpx_client,
     )
+    if settings.sentence_transformer_lazy_load:
+        # 延迟到首次编码时加载，缩短启动时间，未使用语义功能的实例不占用模型内存
+        app.state.sentence_transformer = _LazySentenceTransformer(
+            settings.sentence_transformer_model,
+            settings.sentence_transformer_fp16,
+        )
+    else:
+        # 模型加载为阻塞操作，放到线程中执行，避免阻塞事件循环
+        app.state.sentence_transformer = await asyncio.to_thread(
+            _load_sentence_transformer,
+            settings.sentence_transformer_model,
+            settings.sentence_transformer_fp16,
+        )
 
     logger.info("Application startup completed")
 
@@ -49,6 +122,7 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
 
     await app.state.openai_client.close()
     await app.state.httpx_client.aclose()
+    await async_job_manager.close()
     await async_engine.dispose()
 
     logger.info("Application shutdown completed")
@@ -60,6 +134,7 @@ def create_app() -> FastAPI:
         version=settings.app_version,
         description=settings.app_description,
         lifespan=lifespan,
+        default_response_class=ORJSONResponse,
         docs_url="/docs" if settings.debug else None,
         redoc_url="/redoc" if settings.debug else None,
     )
@@ -92,7 +167,7 @@ def create_app() -> FastAPI:
             inprogress_labels=True,
         )
         instrumentator.instrument(app).expose(app, endpoint=settings.metrics_path)
-        logger.info(f"Metrics enabled at {settings.metrics_path}")
+        logger.info("Metrics enabled at %s", settings.metrics_path)
 
     # 注册所有服务路由
     scanner = RouterScanner(app)
@@ -121,7 +196,7 @@ def create_app() -> FastAPI:
     async def list_routes():
         """列出所有路由(仅调试模式)"""
         if not settings.debug:
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=403,
                 content={"detail": "This endpoint is only available in debug mode"},
             )
@@ -162,18 +237,12 @@ def create_app() -> FastAPI:
         """
         job = await async_job_manager.get_async_job(job_id)
         if job is None:
-            return Response(
-                content=orjson.dumps(
-                    {"code": 404, "message": "Job not found", "data": None}
-                ),
-                media_type="application/json",
+            return ORJSONResponse(
                 status_code=404,
+                content={"code": 404, "message": "Job not found", "data": None},
             )
 
-        return Response(
-            content=orjson.dumps({"code": 200, "message": "success", "data": job}),
-            media_type="application/json",
-        )
+        return success_response(job)
 
     @app.get("/jobs", tags=["Jobs"])
     async def get_async_jobs(
@@ -205,8 +274,8 @@ def create_app() -> FastAPI:
                             "progress": 0,
                             "result": {} | null,
                             "error": "string | null",
-                            "created_at": "string",
-                            "updated_at": "string"
+                            "created_at": "string (ISO datetime)",
+                            "updated_at": "string (ISO datetime)"
                         }
                     ],
                     "total": 0,
@@ -219,10 +288,18 @@ def create_app() -> FastAPI:
         jobs = await async_job_manager.get_async_jobs(
             page=page, size=size, with_result=with_result
         )
-        return Response(
-            content=orjson.dumps({"code": 200, "message": "success", "data": jobs}),
-            media_type="application/json",
+        # 逐条序列化任务后拼接到预先格式化的响应框架中，不再构建并遍历外层字典
+        items = b",".join(
+            orjson.dumps(item, option=ORJSON_OPTIONS) for item in jobs["items"]
         )
+        content = (
+            SUCCESS_PREFIX
+            + b'{"items":['
+            + items
+            + b'],"total":%d,"page":%d,"size":%d}' % (jobs["total"], page, size)
+            + SUCCESS_SUFFIX
+        )
+        return Response(content=content, media_type="application/json")
 
     @app.get("/jobs/{job_id}/cancel", tags=["Jobs"])
     async def cancel_async_job(job_id: str) -> Response:
@@ -244,14 +321,12 @@ def create_app() -> FastAPI:
         """
         cancelled = await async_job_manager.cancel_async_job(job_id)
         if not cancelled:
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=400,
                 content={"code": 400, "message": "Job not found", "data": None},
             )
 
-        return JSONResponse(
-            status_code=200, content={"code": 200, "message": "success", "data": None}
-        )
+        return success_response()
 
     logger.info("FastAPI application initialized")
 
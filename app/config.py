@@ -54,17 +54,47 @@ class GlobalSettings(BaseSettings):
     openai_base_url: str = Field(
         default="", description="OpenAI API 基础 URL"
     )
+    openai_max_retries: int = Field(
+        default=2, description="OpenAI 请求失败(连接错误、429、5xx)重试次数"
+    )
+
+    # HTTP 客户端配置
+    http2: bool = Field(
+        default=False, description="是否启用 HTTP/2，需安装 h2 (httpx[http2])"
+    )
+    http_max_connections: int = Field(default=200, description="HTTP 最大连接数")
+    http_max_keepalive_connections: int = Field(
+        default=100, description="HTTP 最大保持连接数"
+    )
+    http_timeout: float = Field(default=60.0, description="HTTP 请求超时(秒)")
+    http_connect_timeout: float = Field(default=2.0, description="HTTP 连接超时(秒)")
 
     # Sentence Transformer 配置
     sentence_transformer_model: str = Field(
         default=".huggingface/bge-m3",
         description="Sentence Transformer 模型",
     )
+    sentence_transformer_fp16: bool = Field(
+        default=True, description="模型位于 GPU 时以半精度运行，CPU 上不生效"
+    )
+    sentence_transformer_lazy_load: bool = Field(
+        default=False, description="是否延迟到首次编码时再加载模型"
+    )
 
     # Database 配置
     database_url: str = Field(
         default="sqlite+aiosqlite:///db.sqlite3",
-        description="数据库 URL",
+        description="数据库 URL，PostgreSQL 请使用 postgresql+psycopg://",
+    )
+    database_pool_size: int = Field(default=20, description="数据库连接池大小")
+    database_max_overflow: int = Field(default=40, description="数据库连接池最大溢出数")
+    database_pool_recycle: int = Field(
+        default=3600, description="数据库连接回收时间(秒)，仅非 SQLite 生效"
+    )
+
+    # 异步任务配置
+    job_update_flush_interval: float = Field(
+        default=0.2, description="任务非终态更新批量写入间隔(秒)"
     )
 
 
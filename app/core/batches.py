@@ -0,0 +1,98 @@
+"""OpenAI Batch API 客户端"""
+
+import asyncio
+import logging
+
+import orjson
+from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+TERMINAL_BATCH_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+class BatchLLMClient:
+    """通过 Batch API 提交一组 chat.completions 请求
+
+    请求写为 JSONL 上传后创建批任务，轮询至终态再下载结果；
+    批量调用费用约为实时调用的一半且不占用实时限流额度，适合离线任务。
+    """
+
+    def __init__(self, openai_client: AsyncOpenAI, poll_interval: float = 30.0):
+        """初始化 Batch API 客户端
+
+        Args:
+            openai_client: OpenAI 客户端
+            poll_interval: 批任务状态轮询间隔(秒)
+        """
+        self.client = openai_client
+        self.poll_interval = poll_interval
+
+    async def complete(self, bodies: list[dict]) -> list[str | None]:
+        """批量执行请求，返回与 bodies 顺序一致的回复内容
+
+        批任务失败、过期或单条请求出错时对应位置为 None，由调用方决定是否回退为实时调用。
+
+        Args:
+            bodies: chat.completions 请求体列表
+        """
+        contents: list[str | None] = [None] * len(bodies)
+        if not bodies:
+            return contents
+
+        data = b"\n".join(
+            orjson.dumps(
+                {
+                    "custom_id": str(index),
+                    "method": "POST",
+                    "url": BATCH_ENDPOINT,
+                    "body": body,
+                }
+            )
+            for index, body in enumerate(bodies)
+        )
+        input_file = await self.client.files.create(
+            file=("batch.jsonl", data), purpose="batch"
+        )
+        batch = await self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window="24h",
+        )
+        logger.info("Submitted batch %s with %d requests", batch.id, len(bodies))
+
+        try:
+            while batch.status not in TERMINAL_BATCH_STATUSES:
+                await asyncio.sleep(self.poll_interval)
+                batch = await self.client.batches.retrieve(batch.id)
+        except asyncio.CancelledError:
+            # 任务取消时一并取消远端批任务，避免继续计费
+            await self.client.batches.cancel(batch.id)
+            raise
+
+        if batch.status != "completed" or batch.output_file_id is None:
+            logger.error("Batch %s finished with status %s", batch.id, batch.status)
+            return contents
+
+        output = await self.client.files.content(batch.output_file_id)
+        for line in output.content.splitlines():
+            if not line:
+                continue
+            record = orjson.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") != 200:
+                continue
+            try:
+                message = response["body"]["choices"][0]["message"]
+                contents[int(record["custom_id"])] = message["content"]
+            except (KeyError, IndexError, TypeError, ValueError):
+                continue
+
+        logger.info(
+            "Batch %s completed: %d/%d succeeded",
+            batch.id,
+            sum(content is not None for content in contents),
+            len(bodies),
+        )
+        return contents
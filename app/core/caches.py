@@ -0,0 +1,114 @@
+"""缓存工具"""
+
+import time
+import asyncio
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any
+
+import numpy as np
+
+
+class LRUCache:
+    """LRU 缓存
+
+    get/set 均为同步操作，不存在 await 切换点，在单个事件循环内使用无需加锁。
+    """
+
+    def __init__(self, capacity: int):
+        """初始化LRU缓存，capacity <= 0 时不缓存"""
+        self.capacity = capacity
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取缓存，命中时标记为最近使用"""
+        try:
+            value = self._data[key]
+        except KeyError:
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        if self.capacity <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.capacity:
+            self._data.popitem(last=False)
+
+
+class SemanticCache:
+    """语义缓存
+
+    以文本向量的余弦相似度匹配缓存条目，相似度不低于阈值且未过期即命中。
+    向量存放在预分配矩阵中，查询为一次矩阵-向量乘法；容量满后按写入顺序覆盖最旧条目。
+    """
+
+    def __init__(
+        self,
+        encoder: Any,
+        threshold: float = 0.92,
+        ttl: float = 3600,
+        capacity: int = 4096,
+    ):
+        """初始化语义缓存
+
+        Args:
+            encoder: 文本向量模型，需提供 SentenceTransformer 兼容的 encode 方法
+            threshold: 命中所需的最小余弦相似度
+            ttl: 条目有效期(秒)
+            capacity: 最大条目数
+        """
+        self.encoder = encoder
+        self.threshold = threshold
+        self.ttl = ttl
+        self.capacity = capacity
+        self._vectors: np.ndarray | None = None
+        self._expires = np.zeros(capacity, dtype=np.float64)
+        self._values: list[Any] = [None] * capacity
+        self._size = 0
+        self._cursor = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    async def embed(self, text: str) -> np.ndarray:
+        """计算归一化文本向量，编码为阻塞操作，放到线程中执行"""
+        embeddings = await asyncio.to_thread(
+            self.encoder.encode,
+            [text],
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        )
+        return embeddings[0].astype(np.float32, copy=False)
+
+    def get(self, embedding: np.ndarray, default: Any = None) -> Any:
+        """查找最相似的未过期条目"""
+        if self._size == 0:
+            return default
+
+        similarities = self._vectors[: self._size] @ embedding
+        similarities[self._expires[: self._size] < time.monotonic()] = -1.0
+        index = int(similarities.argmax())
+        if similarities[index] < self.threshold:
+            return default
+        return self._values[index]
+
+    def set(self, embedding: np.ndarray, value: Any) -> None:
+        """写入条目"""
+        if self.capacity <= 0:
+            return
+        if self._vectors is None:
+            self._vectors = np.zeros((self.capacity, embedding.shape[0]), np.float32)
+
+        index = self._cursor
+        self._vectors[index] = embedding
+        self._expires[index] = time.monotonic() + self.ttl
+        self._values[index] = value
+        self._cursor = (index + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
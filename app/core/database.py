@@ -1,21 +1,82 @@
 from datetime import datetime
+from enum import Enum
+from typing import Any
 
 import orjson
-from sqlalchemy import DateTime, JSON, TypeDecorator, inspect
+from sqlalchemy import JSON, DateTime, TypeDecorator, event, inspect
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from sqlalchemy.pool import StaticPool
 
 from app.config import settings
 from app.core.enum import JobStatus, JobType
 
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+)
+
+
+def _is_memory_sqlite(database_url: str) -> bool:
+    """是否为内存 SQLite，SQLAlchemy 为其使用 StaticPool"""
+    url = make_url(database_url)
+    return url.get_backend_name() == "sqlite" and (
+        url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+    )
+
+
+def _orjson_dumps(value: Any) -> str:
+    """JSON 列序列化，引擎要求返回字符串"""
+    return orjson.dumps(value).decode()
+
+
+def _engine_options(database_url: str) -> dict:
+    """按数据库类型构建引擎参数"""
+    options = {
+        "pool_pre_ping": True,
+        # JSON 列使用 orjson 编解码
+        "json_serializer": _orjson_dumps,
+        "json_deserializer": orjson.loads,
+    }
+    if _is_memory_sqlite(database_url):
+        # 内存库只存在于单个连接中，显式使用 StaticPool；该连接池不接受连接池大小参数
+        options["poolclass"] = StaticPool
+    else:
+        options["pool_size"] = settings.database_pool_size
+        options["max_overflow"] = settings.database_max_overflow
+    if database_url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options["pool_use_lifo"] = True
+        options["pool_recycle"] = settings.database_pool_recycle
+    if database_url.startswith("postgresql+psycopg"):
+        # psycopg 同一语句执行一次后即在服务端预编译(默认 5 次)，高频的任务更新与查询可复用执行计划
+        options["connect_args"] = {"prepare_threshold": 1}
+    return options
+
+
 async_engine = create_async_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False} if settings.database_url.startswith("sqlite") else {},
+    settings.database_url, **_engine_options(settings.database_url)
 )
 
+if async_engine.dialect.name == "sqlite":
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """新建连接时设置 SQLite PRAGMA：WAL 模式允许读写并发"""
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
+
 async_session = async_sessionmaker(
     async_engine,
     expire_on_commit=False,
+    autoflush=False,
 )
 
 
@@ -24,39 +85,47 @@ class Base(DeclarativeBase):
 
 
 class OrJSON(TypeDecorator):
-    """ORJSON类型增强"""
+    """ORJSON类型增强
+
+    保持原生 JSON 列，编解码由引擎的 json_serializer/json_deserializer(orjson)一次完成，
+    不再先序列化为字符串再交给 JSON 类型二次编码。
+    旧版本写入的二次编码数据读出为字符串，读取时再解码一次，已有数据无需迁移。
+    """
 
     impl = JSON
     cache_ok = True
 
     def process_bind_param(self, value, dialect):
-        return orjson.dumps(value).decode("utf-8") if value else None
+        return value if value else None
 
     def process_result_value(self, value, dialect):
-        return orjson.loads(value) if value else None
-
-
-class LocalDatetime(TypeDecorator):
-    """本地时间类型增强"""
-
-    impl = DateTime
-    cache_ok = True
-
-    def process_result_value(self, value, dialect):
-        return value.strftime("%Y-%m-%d %H:%M:%S") if value else None
+        if isinstance(value, str):
+            return orjson.loads(value)
+        return value if value else None
 
 
 class LoadOnlyDictMixin:
     """只返回已加载的属性"""
 
+    @classmethod
+    def _column_keys(cls) -> tuple[str, ...]:
+        """列名元组，首次调用时从 mapper 中读取并缓存在类上"""
+        keys = cls.__dict__.get("__column_keys__")
+        if keys is None:
+            keys = tuple(column.key for column in inspect(cls).column_attrs)
+            cls.__column_keys__ = keys
+        return keys
+
     def to_dict(self):
-        inst = inspect(self)
+        # 已加载的列值存放在实例 __dict__ 中，未加载/已过期的列不在其中
+        values = self.__dict__
 
-        return {
-            column.key: getattr(self, column.key)
-            for column in inst.mapper.column_attrs
-            if column.key not in inst.unloaded
-        }
+        data = {}
+        for key in self._column_keys():
+            if key in values:
+                value = values[key]
+                data[key] = value.value if isinstance(value, Enum) else value
+        return data
 
 
 class Job(Base, LoadOnlyDictMixin):
@@ -71,7 +140,8 @@ class Job(Base, LoadOnlyDictMixin):
     progress: Mapped[int] = mapped_column(nullable=False, default=0)
     result: Mapped[dict | None] = mapped_column(OrJSON, nullable=True)
     error: Mapped[str | None] = mapped_column(nullable=True)
-    created_at: Mapped[datetime] = mapped_column(LocalDatetime, default=datetime.now)
+    # 以原生 datetime 返回，由 orjson 在响应序列化时输出 ISO-8601 格式
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
     updated_at: Mapped[datetime] = mapped_column(
-        LocalDatetime, default=datetime.now, onupdate=datetime.now
+        DateTime, default=datetime.now, onupdate=datetime.now
     )
@@ -2,16 +2,28 @@ import uuid
 import asyncio
 import logging
 from collections.abc import Callable
+from enum import Enum
+from functools import partial
 from typing import Any, Coroutine, Self
 
-from sqlalchemy import func, select, update
-from sqlalchemy.orm import load_only
+from sqlalchemy import func, inspect, select, update
 
+from app.config import settings
 from app.core.database import async_session, Job
 from app.core.enum import JobStatus, JobType
 
 logger = logging.getLogger(__name__)
 
+# 终态：到达后立即落库，不参与批量合并
+TERMINAL_JOB_STATUSES = frozenset(
+    {JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED}
+)
+
+# 允许作为过滤条件的列：列名 -> 列属性
+_JOB_FILTER_COLS = {
+    column.key: getattr(Job, column.key) for column in inspect(Job).column_attrs
+}
+
 
 class AsyncJobManager:
     """异步任务管理器"""
@@ -32,6 +44,12 @@ class AsyncJobManager:
         # 运行中的异步任务：job_id -> asyncio.Task，用于取消等操作
         self._async_tasks: dict[str, asyncio.Task] = {}
 
+        # 待落库的非终态更新：job_id -> 合并后的字段（后写覆盖先写）
+        self._pending_updates: dict[str, dict[str, Any]] = {}
+        self._flush_task: asyncio.Task | None = None
+        # 串行化写入，保证批量刷新与终态更新的落库顺序
+        self._write_lock = asyncio.Lock()
+
     async def create_async_job(
         self,
         job_type: JobType,
@@ -42,36 +60,54 @@ class AsyncJobManager:
         """创建异步任务记录"""
         job_id = str(uuid.uuid4())
 
-        async with async_session() as session:
-            job = Job(
-                job_id=job_id,
-                job_type=job_type,
+        # 直接以 RUNNING 状态插入，一次提交完成建档；
+        # 任务在提交后再创建，避免任务先于记录落库就开始更新
+        async with async_session() as session, session.begin():
+            session.add(
+                Job(job_id=job_id, job_type=job_type, status=JobStatus.RUNNING)
             )
-            session.add(job)
-            await session.commit()
 
-            try:
-                task = asyncio.create_task(coro(job_id, *args, **kwargs))
-                self._async_tasks[job_id] = task
-                await self.update_async_job(job_id, status=JobStatus.RUNNING)
-            except Exception as e:
-                logger.exception(
-                    "Failed to create async task for job %s", job_id, exc_info=True
-                )
-                await self.update_async_job(
-                    job_id, status=JobStatus.FAILED, error=str(e)
-                )
+        try:
+            task = asyncio.create_task(coro(job_id, *args, **kwargs))
+        except Exception as e:
+            logger.exception(
+                "Failed to create async task for job %s", job_id, exc_info=True
+            )
+            await self.update_async_job(job_id, status=JobStatus.FAILED, error=str(e))
+            return job_id
+
+        # _async_tasks 只在事件循环线程内读写，无需加锁
+        self._async_tasks[job_id] = task
+        task.add_done_callback(partial(self._discard_async_task, job_id))
         return job_id
 
+    def _discard_async_task(self, job_id: str, task: asyncio.Task) -> None:
+        """任务结束后移除运行中任务记录"""
+        if self._async_tasks.get(job_id) is task:
+            del self._async_tasks[job_id]
+
     async def get_async_job(self, job_id: str) -> dict | None:
         """获取异步任务详情"""
-        async with async_session() as session:
+        async with async_session() as session, session.begin():
             result = await session.execute(select(Job).where(Job.job_id == job_id))
             job = result.scalar_one_or_none()
             if job is None:
                 return None
 
-            return job.to_dict()
+            job_dict = job.to_dict()
+
+        return self._overlay_pending_updates(job_dict)
+
+    def _overlay_pending_updates(self, job_dict: dict) -> dict:
+        """叠加尚未落库的更新，保证读到最新进度；只覆盖已查询的字段"""
+        pending = self._pending_updates.get(job_dict["job_id"])
+        if pending:
+            job_dict.update(
+                (key, value.value if isinstance(value, Enum) else value)
+                for key, value in pending.items()
+                if key in job_dict
+            )
+        return job_dict
 
     async def get_async_jobs(
         self, page: int, size: int, with_result: bool, **kwargs: Any
@@ -81,61 +117,108 @@ class AsyncJobManager:
         kwargs 为其他过滤条件，如 job_type、status 等
         """
         # 构建过滤条件
-        filters = []
-        for key, value in kwargs.items():
-            if hasattr(Job, key):
-                filters.append(getattr(Job, key) == value)
-
-        # 构建查询
+        filters = [
+            _JOB_FILTER_COLS[key] == value
+            for key, value in kwargs.items()
+            if key in _JOB_FILTER_COLS
+        ]
+
+        # 构建查询：只读列表直接查询列，跳过 ORM 实例构建
+        columns = [Job.id, Job.job_id, Job.job_type, Job.status, Job.progress]
         if with_result:
-            stmt = select(Job)
-        else:
-            stmt = select(Job).options(
-                load_only(
-                    Job.job_id,
-                    Job.job_type,
-                    Job.status,
-                    Job.progress,
-                    Job.error,
-                    Job.created_at,
-                    Job.updated_at,
-                )
-            )
+            columns.append(Job.result)
+        columns.extend([Job.error, Job.created_at, Job.updated_at])
 
+        # 窗口函数随分页结果一并返回总数，省去单独的 COUNT 往返
+        stmt = select(*columns, func.count().over().label("total"))
         for f in filters:
             stmt = stmt.where(f)
-        stmt = stmt.order_by(Job.created_at.desc())
-
-        async with async_session() as session:
-            count_stmt = select(func.count(Job.id))
-            for f in filters:
-                count_stmt = count_stmt.where(f)
-            count_result = await session.execute(count_stmt)
-            total = count_result.scalar() or 0
-
-            offset = (page - 1) * size
-            result = await session.execute(stmt.offset(offset).limit(size))
-            jobs = result.scalars().all()
-
-        items = [job.to_dict() for job in jobs]
-
+        offset = (page - 1) * size
+        stmt = stmt.order_by(Job.created_at.desc()).offset(offset).limit(size)
+
+        async with async_session() as session, session.begin():
+            result = await session.execute(stmt)
+            items = [dict(row) for row in result.mappings()]
+
+            total = 0
+            for item in items:
+                total = item.pop("total")
+
+            # 页码超出范围时结果为空，需单独统计总数
+            if not items and offset > 0:
+                count_stmt = select(func.count(Job.id))
+                for f in filters:
+                    count_stmt = count_stmt.where(f)
+                count_result = await session.execute(count_stmt)
+                total = count_result.scalar() or 0
+
+        items = [self._overlay_pending_updates(item) for item in items]
         return {"items": items, "total": total, "page": page, "size": size}
 
     async def update_async_job(self, job_id: str, **kwargs: Any) -> None:
-        """更新异步任务详情"""
-        async with async_session() as session:
-            stmt = update(Job).where(Job.job_id == job_id).values(**kwargs)
-            await session.execute(stmt)
-            await session.commit()
+        """更新异步任务详情
 
-        status = kwargs.get("status")
-        if status in (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED):
-            self._async_tasks.pop(job_id, None)
+        非终态更新（如进度）先在内存中合并，按 job_update_flush_interval 批量落库；
+        终态更新连同该任务尚未落库的更新立即写入。
+        """
+        if kwargs.get("status") in TERMINAL_JOB_STATUSES:
+            async with self._write_lock:
+                values = self._pending_updates.pop(job_id, {})
+                values.update(kwargs)
+                await self._write_updates({job_id: values})
+            return
+
+        self._pending_updates.setdefault(job_id, {}).update(kwargs)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        """等待一个刷新周期后批量写入"""
+        await asyncio.sleep(settings.job_update_flush_interval)
+        try:
+            await self.flush_async_jobs()
+        except Exception:
+            # 后台任务无人等待，异常在此记录；失败的更新已放回待写队列
+            logger.exception("Failed to flush job updates")
+
+    async def flush_async_jobs(self) -> None:
+        """将内存中合并的更新在同一事务中写入数据库"""
+        async with self._write_lock:
+            if not self._pending_updates:
+                return
+            pending, self._pending_updates = self._pending_updates, {}
+            try:
+                await self._write_updates(pending)
+            except BaseException:
+                # 写入失败或被取消时事务已回滚，放回待写队列，期间新到的更新优先
+                for job_id, values in pending.items():
+                    self._pending_updates[job_id] = {
+                        **values,
+                        **self._pending_updates.get(job_id, {}),
+                    }
+                raise
+
+    @staticmethod
+    async def _write_updates(updates: dict[str, dict[str, Any]]) -> None:
+        """写入任务更新：job_id -> 字段"""
+        async with async_session() as session, session.begin():
+            for job_id, values in updates.items():
+                stmt = update(Job).where(Job.job_id == job_id).values(**values)
+                await session.execute(stmt)
+
+    async def close(self) -> None:
+        """停止定时刷新并写入剩余的更新"""
+        flush_task = self._flush_task
+        if flush_task is not None and not flush_task.done():
+            flush_task.cancel()
+            # 等待任务真正结束，写入中途被取消的更新已放回待写队列
+            await asyncio.gather(flush_task, return_exceptions=True)
+        await self.flush_async_jobs()
 
     async def cancel_async_job(self, job_id: str) -> bool:
         """取消异步任务并更新数据库状态"""
         task = self._async_tasks.pop(job_id, None)
-        if task is None:
+        if task is None or task.done():
             return False
 
         task.cancel()
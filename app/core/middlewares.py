@@ -6,7 +6,7 @@ from typing import Callable
 
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 logger = logging.getLogger(__name__)
 
@@ -33,14 +33,19 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
         self.log_request_body = log_request_body
         self.log_request_body_length = log_request_body_length
         self.exclude_paths = exclude_paths or ["/health", "/metrics"]
+        # 前缀元组，供 str.startswith 一次匹配
+        self._exclude_prefixes = tuple(self.exclude_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """非 HTTP 请求及排除路径直接透传，不构造 Request 与中间件调用链"""
+        if scope["type"] != "http" or scope["path"].startswith(self._exclude_prefixes):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
 
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         """处理请求并记录日志"""
 
-        # 检查是否应该跳过此路径
-        if any(request.url.path.startswith(path) for path in self.exclude_paths):
-            return await call_next(request)
-
         # 记录请求开始时间
         start_time = time.perf_counter()
 
@@ -62,17 +67,13 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
             try:
                 body_bytes = await request.body()
                 if body_bytes:
-                    # 将 body 重新设置到 request，因为已经读取过了
-                    async def receive():
-                        return {"type": "http.request", "body": body_bytes}
-
-                    request._receive = receive
+                    # BaseHTTPMiddleware 会缓存已读取的 body 并回放给下游，无需替换 receive
                     # 安全地处理请求体（支持二进制数据）
                     body_info = self._process_request_body(body_bytes, request)
                     if body_info:
                         request_info["body"] = body_info
             except Exception as e:
-                logger.warning(f"Failed to read request body: {e}")
+                logger.warning("Failed to read request body: %s", e)
 
         # 记录请求头（过滤敏感信息）
         headers = dict(request.headers)
@@ -84,7 +85,7 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
         request_info["headers"] = filtered_headers
 
         logger.info(
-            f"请求开始: {request.method} {request.url.path} | 客户端IP: {client_ip}"
+            "请求开始: %s %s | 客户端IP: %s", request.method, request.url.path, client_ip
         )
 
         # 执行请求
@@ -94,8 +95,12 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
             # 记录异常
             process_time = time.perf_counter() - start_time
             logger.error(
-                f"请求异常: {request.method} {request.url.path} | "
-                f"客户端IP: {client_ip} | 处理时间: {process_time:.3f}s | 错误: {str(e)}",
+                "请求异常: %s %s | 客户端IP: %s | 处理时间: %.3fs | 错误: %s",
+                request.method,
+                request.url.path,
+                client_ip,
+                process_time,
+                e,
                 exc_info=True,
             )
             raise
@@ -103,32 +108,31 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
         # 计算处理时间
         process_time = time.perf_counter() - start_time
 
-        # 记录响应信息
-        response_info = {
-            "status_code": response.status_code,
-            "process_time": f"{process_time:.3f}s",
-        }
-
-        # 组合日志信息
-        log_message = (
-            f"请求完成: {request.method} {request.url.path} | "
-            f"状态码: {response.status_code} | "
-            f"客户端IP: {client_ip} | "
-            f"处理时间: {process_time:.3f}s"
-        )
-
         # 根据状态码选择日志级别
         if response.status_code >= 500:
-            logger.error(log_message)
+            level = logging.ERROR
         elif response.status_code >= 400:
-            logger.warning(log_message)
+            level = logging.WARNING
         else:
-            logger.info(log_message)
+            level = logging.INFO
+        logger.log(
+            level,
+            "请求完成: %s %s | 状态码: %d | 客户端IP: %s | 处理时间: %.3fs",
+            request.method,
+            request.url.path,
+            response.status_code,
+            client_ip,
+            process_time,
+        )
 
         # 在调试模式下记录详细信息
         if logger.isEnabledFor(logging.DEBUG):
-            logger.debug(f"请求详情: {request_info}")
-            logger.debug(f"响应详情: {response_info}")
+            response_info = {
+                "status_code": response.status_code,
+                "process_time": f"{process_time:.3f}s",
+            }
+            logger.debug("请求详情: %s", request_info)
+            logger.debug("响应详情: %s", response_info)
 
         return response
 
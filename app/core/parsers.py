@@ -0,0 +1,107 @@
+"""流式输出解析工具"""
+
+
+class JSONObjectScanner:
+    """增量 JSON 对象扫描器
+
+    逐段接收模型流式输出，跟踪字符串与括号深度，首个顶层对象闭合时立即返回其文本，
+    无需等待整个流结束。对象之外的文本（如前后说明文字）会被忽略。
+    """
+
+    def __init__(self):
+        """初始化扫描器"""
+        self.text = ""
+        self._depth = 0
+        self._start = -1
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> str | None:
+        """输入一段文本，首个顶层对象闭合时返回该对象的完整文本，否则返回 None"""
+        offset = len(self.text)
+        self.text += chunk
+
+        for index, char in enumerate(chunk, offset):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                # 只跟踪对象内部的字符串，对象外的引号不影响扫描
+                self._in_string = self._depth > 0
+            elif char == "{":
+                if self._depth == 0:
+                    self._start = index
+                self._depth += 1
+            elif char == "}" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    return self.text[self._start : index + 1]
+
+        return None
+
+
+class JSONArrayScanner:
+    """增量 JSON 数组扫描器
+
+    逐段接收模型流式输出，跟踪字符串与括号深度，对象数组中的元素一旦闭合即返回其文本，
+    无需等待整个数组结束。只有 "[" 后(可隔空白)紧跟 "{" 才视为数组开始，
+    数组之前含方括号的说明文字(如 "[注]")与数组之后的文本均被忽略。
+    """
+
+    def __init__(self):
+        """初始化扫描器"""
+        self.text = ""
+        self._depth = 0
+        self._start = -1
+        self._in_string = False
+        self._escape = False
+        # 已读到 "["，等待下一个非空白字符确认是否为对象数组
+        self._opening = False
+        self._closed = False
+
+    def feed(self, chunk: str) -> list[str]:
+        """输入一段文本，返回本段内闭合的数组元素对象文本"""
+        offset = len(self.text)
+        self.text += chunk
+        if self._closed:
+            return []
+
+        elements = []
+        for index, char in enumerate(chunk, offset):
+            if self._opening:
+                if char.isspace():
+                    continue
+                self._opening = False
+                if char != "{":
+                    continue
+                self._depth = 1
+            elif self._depth == 0:
+                self._opening = char == "["
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "[{":
+                if self._depth == 1 and char == "{":
+                    self._start = index
+                self._depth += 1
+            elif char in "]}":
+                self._depth -= 1
+                if self._depth == 1 and char == "}":
+                    elements.append(self.text[self._start : index + 1])
+                elif self._depth == 0:
+                    self._closed = True
+                    break
+
+        return elements
@@ -0,0 +1,44 @@
+"""响应类型"""
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+# datetime 输出为秒级 ISO-8601，如 2024-01-01T12:00:00
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_OMIT_MICROSECONDS
+)
+
+
+class ORJSONResponse(JSONResponse):
+    """使用 orjson 序列化的 JSON 响应"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+# 成功响应外层结构的固定部分，只需序列化 data
+SUCCESS_PREFIX = b'{"code":200,"message":"success","data":'
+SUCCESS_SUFFIX = b"}"
+
+
+def _success_body(data: Any) -> bytes:
+    """拼接成功响应体"""
+    return SUCCESS_PREFIX + orjson.dumps(data, option=ORJSON_OPTIONS) + SUCCESS_SUFFIX
+
+
+def success_response(data: Any = None) -> Response:
+    """构建成功响应：{"code": 200, "message": "success", "data": data}"""
+    return Response(content=_success_body(data), media_type="application/json")
+
+
+def success_file_response(data: Any, filename: str) -> Response:
+    """构建成功响应的文件下载版本，内容与 success_response 相同"""
+    return Response(
+        content=_success_body(data),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,57 @@
+"""有界并发执行工具"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Sequence
+from typing import Any
+
+
+async def map_with_workers(
+    func: Callable[[Any], Awaitable[Any]],
+    items: Sequence[Any],
+    workers: int,
+    on_done: Callable[[int], Awaitable[None]] | None = None,
+) -> list[Any]:
+    """以固定数量的 worker 并发处理 items，结果顺序与输入一致
+
+    生产者向有界队列投递任务，队列满时阻塞，任意时刻最多只有 workers 个调用在执行，
+    不会为每个元素预先创建协程。任一调用失败时取消其余 worker 并抛出该异常。
+
+    Args:
+        func: 处理单个元素的协程函数
+        items: 待处理元素
+        workers: worker 数量
+        on_done: 每完成一个元素后回调，参数为已完成数量
+    """
+    results: list[Any] = [None] * len(items)
+    if not items:
+        return results
+
+    workers = max(1, min(workers, len(items)))
+    queue: asyncio.Queue[tuple[int, Any] | None] = asyncio.Queue(maxsize=workers * 2)
+    done = 0
+
+    async def produce() -> None:
+        for entry in enumerate(items):
+            await queue.put(entry)
+        for _ in range(workers):
+            await queue.put(None)
+
+    async def work() -> None:
+        nonlocal done
+        while (entry := await queue.get()) is not None:
+            index, item = entry
+            results[index] = await func(item)
+            done += 1
+            if on_done is not None:
+                await on_done(done)
+
+    try:
+        async with asyncio.TaskGroup() as task_group:
+            task_group.create_task(produce())
+            for _ in range(workers):
+                task_group.create_task(work())
+    except ExceptionGroup as exc_group:
+        # 保持与逐条 await 相同的异常类型，便于调用方处理
+        raise exc_group.exceptions[0] from None
+
+    return results
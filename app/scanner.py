@@ -35,8 +35,8 @@ class RouterScanner:
         services = []
 
         if not self.services_path.exists():
-            logger.warning(f"Services path {self.services_path} does not exist")
-            return
+            logger.warning("Services path %s does not exist", self.services_path)
+            return services
 
         # 遍历 services 目录
         for service in self.services_path.iterdir():
@@ -45,7 +45,8 @@ class RouterScanner:
 
             services.append(service.name)
 
-        return services
+        # 保证注册顺序稳定，不依赖文件系统的遍历顺序
+        return sorted(services)
 
     def _register_service(self, service_name: str) -> None:
         """注册单个服务的路由
@@ -61,7 +62,7 @@ class RouterScanner:
             # 获取 router 对象
             if not hasattr(module, "router"):
                 logger.warning(
-                    f"Service {service_name} does not have a 'router' object"
+                    "Service %s does not have a 'router' object", service_name
                 )
                 return
 
@@ -71,14 +72,14 @@ class RouterScanner:
             self.app.include_router(router)
 
             logger.info(
-                f"Registered service: {service_name} with prefix: {router.prefix}"
+                "Registered service: %s with prefix: %s", service_name, router.prefix
             )
 
         except ModuleNotFoundError as e:
-            logger.error(f"Failed to import service {service_name}: {e}")
+            logger.error("Failed to import service %s: %s", service_name, e)
         except Exception as e:
             logger.error(
-                f"Error registering service {service_name}: {e}", exc_info=True
+                "Error registering service %s: %s", service_name, e, exc_info=True
             )
 
     def get_registered_routes(self) -> list[dict[str, Any]]:
@@ -18,5 +18,30 @@ class AnswerEnhancementSettings(BaseSettings):
     enhancer_temperature: float = Field(default=0.3, description="增强器温度")
     extractor_temperature: float = Field(default=0.01, description="提取器温度")
 
+    # 本地策略分类器配置
+    ml_checker_weights: str = Field(
+        default="", description="本地策略分类头权重(npz)路径，为空时仅使用LLM检查器"
+    )
+    ml_checker_threshold: float = Field(
+        default=0.7, description="本地分类器最低置信度，低于该值回退到LLM检查器"
+    )
+
+    # 并发配置
+    max_concurrency: int = Field(default=8, description="批量增强最大并发数")
+    enhance_batch_size: int = Field(
+        default=8, description="批量增强时每次请求合并的条数，<=1 时逐条请求"
+    )
+
+    # 缓存配置
+    cache_capacity: int = Field(default=4096, description="LLM结果缓存容量")
+    semantic_cache_enabled: bool = Field(
+        default=False, description="是否启用增强/提取结果语义缓存"
+    )
+    semantic_cache_threshold: float = Field(
+        default=0.92, description="语义缓存命中相似度阈值"
+    )
+    semantic_cache_ttl: float = Field(default=3600, description="语义缓存有效期(秒)")
+    semantic_cache_capacity: int = Field(default=4096, description="语义缓存容量")
+
 
 enhancement_service_settings = AnswerEnhancementSettings()
@@ -5,10 +5,25 @@ from .config import enhancement_service_settings
 
 
 def get_answer_enhancement_service(request: Request) -> AnswerEnhancementService:
-    return AnswerEnhancementService(
-        request.app.state.openai_client,
-        enhancement_service_settings.llm_model,
-        enhancement_service_settings.checker_temperature,
-        enhancement_service_settings.enhancer_temperature,
-        enhancement_service_settings.extractor_temperature,
-    )
+    # 服务无请求级状态，首次使用时创建并缓存在 app.state 上，缓存随之跨请求生效
+    service = getattr(request.app.state, "answer_enhancement_service", None)
+    if service is None:
+        service = AnswerEnhancementService(
+            request.app.state.openai_client,
+            enhancement_service_settings.llm_model,
+            enhancement_service_settings.checker_temperature,
+            enhancement_service_settings.enhancer_temperature,
+            enhancement_service_settings.extractor_temperature,
+            enhancement_service_settings.cache_capacity,
+            enhancement_service_settings.max_concurrency,
+            enhancement_service_settings.enhance_batch_size,
+            request.app.state.sentence_transformer,
+            enhancement_service_settings.semantic_cache_enabled,
+            enhancement_service_settings.semantic_cache_threshold,
+            enhancement_service_settings.semantic_cache_ttl,
+            enhancement_service_settings.semantic_cache_capacity,
+            enhancement_service_settings.ml_checker_weights,
+            enhancement_service_settings.ml_checker_threshold,
+        )
+        request.app.state.answer_enhancement_service = service
+    return service
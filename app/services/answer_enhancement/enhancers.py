@@ -1,8 +1,15 @@
+import asyncio
+import hashlib
 import logging
+import textwrap
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
 
+import orjson
 from openai import AsyncOpenAI
 
+from app.core.caches import LRUCache, SemanticCache
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,168 +37,296 @@ class RuleEnhancer(Enhancer):
 class LLMEnhancer(Enhancer):
     """LLM增强器"""
 
-    system_prompt: str = """
-    <role>
-    你是一位专业、亲切的客服人员,负责为用户提供产品咨询服务。
-    你需要根据既定策略,优化客服回复,确保回复简洁、专业、易懂,让用户感受到优质的服务体验。
-    </role>
-
-    <task>
-    根据选定的策略,优化最终答案。
-    </task>
-
-    <execution_rules>
-    <rule name="DIRECT">
-    直接使用原始答案,不做任何修改。
-    </rule>
-
-    <rule name="GUIDANCE">
-    为原始答案添加自然的引导语,不改变原始答案的内容,不添加额外的图片/视频链接。
-
-    处理方式:
-    - 如果原始答案仅含链接: 添加引导语 + 保留原链接
-    - 如果原始答案含文本+链接: 保留原文本 + 在链接前添加过渡语 + 保留原链接
-    - 如果原始答案不含链接: 保留原文本 + 添加引导语
-
-    客服引导语示例:
-    - "我给您发几张实拍图吧"
-    - "给您看看产品视频"
-    - "这是实物图片"
-    - "我再给您发几张图片看看"
-    - "给您展示一下实物"
-    - "给您看看外观图"
-    </rule>
-
-    <rule name="ENHANCE">
-    优化改写原始答案,使其更加客服化、易懂、亲切。
-
-    优化原则:
-    1. 简化专业术语,用通俗易懂的语言解释
-    2. 增加服务性用语,提升亲和力
-    3. 补充完整表达,避免过于简略
-    4. 优化语句结构,使其更流畅自然
-    5. 突出核心卖点,避免罗列参数
-    6. 保持客观真实,不夸大不虚假
-
-    优化示例:
-    - 原始: "7999元起"
-    - 优化: "这款售价7999元起,性价比很高"
-
-    - 原始: "本产品配备5000mAh电池容量,支持66W快充技术"
-    - 优化: "这款配备5000mAh大电池,支持66W快充。正常使用一整天完全没问题"
-
-    - 原始: "支持5G网络,包括SA和NSA双模"
-    - 优化: "支持5G网络,双模全网通,网速更快更稳定"
-
-    客服话术要点:
-    - 突出用户利益点而非技术参数
-    - 语气自然亲切,像朋友推荐
-    </rule>
-    </execution_rules>
-
-    <constraints>
-    1. 总回答不超过3句话(不包含引导语)
-    2. 每句话不超过20字(不含标点、引导语、图片链接、视频链接)
-    3. 保持语气自然、专业、简洁
-    4. 不添加多余的客套话或冗余信息
-    5. ENHANCE策略必须保留原始答案的核心信息,不能改变事实
-    6. GUIDANCE策略只负责添加引导语,不改变原始答案的内容
-    </constraints>
-
-    <output_format>
-    直接输出最终答案,不要添加任何标签或说明。
-    </output_format>
-
-    <examples>
-    <example>
-    策略: DIRECT
-    用户问题: 苹果耳机跟你们音质最好的耳机对比哪个好?
-    原始答案: 作为音质巅峰,VERTU耳机融入伦敦交响乐团专属调校。其具备Hi-Fi级解码与3D环绕音效,还原现场听感。
-    输出: 作为音质巅峰,VERTU耳机融入伦敦交响乐团专属调校。其具备Hi-Fi级解码与3D环绕音效,还原现场听感。
-    </example>
-
-    <example>
-    策略: GUIDANCE
-    用户问题: 拍照怎么样?
-    原始答案: [QuantumFlip实拍图]
-    输出: 我给您发几张实拍图吧[QuantumFlip实拍图]
-    </example>
-
-    <example>
-    策略: GUIDANCE
-    用户问题: 拍照怎么样?
-    原始答案: QuantumFlip后置5000万AI双摄,支持双重防抖。[QuantumFlip实拍图]
-    输出: QuantumFlip后置5000万AI双摄,支持双重防抖。我给您发几张实拍图吧[QuantumFlip实拍图]
-    </example>
-
-    <example>
-    策略: GUIDANCE
-    用户问题: 拍照怎么样?
-    原始答案: QuantumFlip后置5000万AI双摄,支持双重防抖。AI暗房师功能配合前置3200万镜头,自拍更立体。
-    输出: QuantumFlip后置5000万AI双摄,支持双重防抖。AI暗房师功能配合前置3200万镜头,自拍更立体。我给您发几张实拍图吧
-    </example>
-
-    <example>
-    策略: GUIDANCE
-    用户问题: 有什么颜色?
-    原始答案: 提供曜石黑、冰川银、星云蓝三种配色
-    输出: 提供曜石黑、冰川银、星云蓝三种配色。给您看看外观图
-    </example>
-
-    <example>
-    策略: ENHANCE
-    用户问题: 电池续航怎么样?
-    原始答案: 本产品配备5000mAh电池容量,支持66W快充技术,正常使用情况下可以使用一天。
-    输出: 这款配备5000mAh大电池,支持66W快充。正常使用一整天完全没问题。
-    </example>
-
-    <example>
-    策略: ENHANCE
-    用户问题: 价格多少?
-    原始答案: 7999元起
-    输出: 这款售价7999元起,性价比很高。
-    </example>
-
-    <example>
-    策略: ENHANCE
-    用户问题: 支持5G吗?
-    原始答案: 支持5G网络,包括SA和NSA双模组网方式,支持N1/N3/N28A/N41/N77/N78/N79等频段。
-    输出: 支持5G网络,双模全网通。网速更快更稳定,体验更流畅。
-    </example>
-    </examples>
-    """
-    user_prompt: str = """
-    <input>
-    - 策略类型: {strategy}
-    - 用户问题: {question}
-    - 原始答案: {answer}
-    </input>
-    """
+    system_prompt: str = textwrap.dedent(
+        """
+        <role>
+        你是一位专业、亲切的客服人员,负责为用户提供产品咨询服务。
+        你需要根据既定策略,优化客服回复,确保回复简洁、专业、易懂,让用户感受到优质的服务体验。
+        </role>
+
+        <task>
+        根据选定的策略,优化最终答案。
+        </task>
+
+        <execution_rules>
+        <rule name="DIRECT">
+        直接使用原始答案,不做任何修改。
+        </rule>
+
+        <rule name="GUIDANCE">
+        为原始答案添加自然的引导语,不改变原始答案的内容,不添加额外的图片/视频链接。
+
+        处理方式:
+        - 如果原始答案仅含链接: 添加引导语 + 保留原链接
+        - 如果原始答案含文本+链接: 保留原文本 + 在链接前添加过渡语 + 保留原链接
+        - 如果原始答案不含链接: 保留原文本 + 添加引导语
+
+        客服引导语示例:
+        - "我给您发几张实拍图吧"
+        - "给您看看产品视频"
+        - "这是实物图片"
+        - "我再给您发几张图片看看"
+        - "给您展示一下实物"
+        - "给您看看外观图"
+        </rule>
+
+        <rule name="ENHANCE">
+        优化改写原始答案,使其更加客服化、易懂、亲切。
+
+        优化原则:
+        1. 简化专业术语,用通俗易懂的语言解释
+        2. 增加服务性用语,提升亲和力
+        3. 补充完整表达,避免过于简略
+        4. 优化语句结构,使其更流畅自然
+        5. 突出核心卖点,避免罗列参数
+        6. 保持客观真实,不夸大不虚假
+
+        优化示例:
+        - 原始: "7999元起"
+        - 优化: "这款售价7999元起,性价比很高"
+
+        - 原始: "本产品配备5000mAh电池容量,支持66W快充技术"
+        - 优化: "这款配备5000mAh大电池,支持66W快充。正常使用一整天完全没问题"
+
+        - 原始: "支持5G网络,包括SA和NSA双模"
+        - 优化: "支持5G网络,双模全网通,网速更快更稳定"
+
+        客服话术要点:
+        - 突出用户利益点而非技术参数
+        - 语气自然亲切,像朋友推荐
+        </rule>
+        </execution_rules>
+
+        <constraints>
+        1. 总回答不超过3句话(不包含引导语)
+        2. 每句话不超过20字(不含标点、引导语、图片链接、视频链接)
+        3. 保持语气自然、专业、简洁
+        4. 不添加多余的客套话或冗余信息
+        5. ENHANCE策略必须保留原始答案的核心信息,不能改变事实
+        6. GUIDANCE策略只负责添加引导语,不改变原始答案的内容
+        </constraints>
+
+        <output_format>
+        直接输出最终答案,不要添加任何标签或说明。
+        </output_format>
+
+        <examples>
+        <example>
+        策略: DIRECT
+        用户问题: 苹果耳机跟你们音质最好的耳机对比哪个好?
+        原始答案: 作为音质巅峰,VERTU耳机融入伦敦交响乐团专属调校。其具备Hi-Fi级解码与3D环绕音效,还原现场听感。
+        输出: 作为音质巅峰,VERTU耳机融入伦敦交响乐团专属调校。其具备Hi-Fi级解码与3D环绕音效,还原现场听感。
+        </example>
+
+        <example>
+        策略: GUIDANCE
+        用户问题: 拍照怎么样?
+        原始答案: QuantumFlip后置5000万AI双摄,支持双重防抖。[QuantumFlip实拍图]
+        输出: QuantumFlip后置5000万AI双摄,支持双重防抖。我给您发几张实拍图吧[QuantumFlip实拍图]
+        </example>
+
+        <example>
+        策略: ENHANCE
+        用户问题: 电池续航怎么样?
+        原始答案: 本产品配备5000mAh电池容量,支持66W快充技术,正常使用情况下可以使用一天。
+        输出: 这款配备5000mAh大电池,支持66W快充。正常使用一整天完全没问题。
+        </example>
+        </examples>
+        """
+    ).strip()
+    user_prompt: str = textwrap.dedent(
+        """
+        <input>
+        - 策略类型: {strategy}
+        - 用户问题: {question}
+        - 原始答案: {answer}
+        </input>
+        """
+    ).strip()
+    batch_prompt: str = textwrap.dedent(
+        """
+        <batch_output_format>
+        批量模式: 输入包含多条<input>,按顺序逐条独立处理,忽略上述output_format。
+        输出JSON对象: {"outputs": ["第1条最终答案", "第2条最终答案", ...]}
+        outputs长度必须与输入条数一致,不要输出任何JSON之外的内容。
+        </batch_output_format>
+        """
+    ).strip()
 
     def __init__(
-        self, openai_client: AsyncOpenAI, llm_model: str, temperature: float = 0.3
+        self,
+        openai_client: AsyncOpenAI,
+        llm_model: str,
+        temperature: float = 0.3,
+        cache_capacity: int = 4096,
+        semantic_cache: SemanticCache | None = None,
     ):
         """初始化LLM增强器"""
         self.client = openai_client
         self.llm_model = llm_model
         self.temperature = temperature
+        self.semantic_cache = semantic_cache
+        self._cache = LRUCache(cache_capacity)
+        self._system_message = {"role": "system", "content": self.system_prompt}
+        self._batch_system_message = {
+            "role": "system",
+            "content": f"{self.system_prompt}\n\n{self.batch_prompt}",
+        }
+
+    def _render(self, question: str, answer: str, strategy: str) -> tuple[str, bytes]:
+        """渲染用户提示词，并计算其精确匹配缓存键"""
+        user_content = self.user_prompt.format_map(
+            {"question": question, "answer": answer, "strategy": strategy}
+        )
+        cache_key = hashlib.blake2b(user_content.encode(), digest_size=16).digest()
+        return user_content, cache_key
 
     async def enhance(self, question: str, answer: str, strategy: str) -> str:
         """增强答案"""
+        user_content, cache_key = self._render(question, answer, strategy)
+
+        # 精确匹配缓存在语义缓存之前，命中时无需计算向量
+        content = self._cache.get(cache_key)
+        if content is not None:
+            return content
+
+        embedding = None
+        if self.semantic_cache is not None:
+            embedding = await self.semantic_cache.embed(user_content)
+            content = self.semantic_cache.get(embedding)
+            if content is not None:
+                return content
+
         response = await self.client.chat.completions.create(
             model=self.llm_model,
             messages=[
-                {"role": "system", "content": self.system_prompt},
+                self._system_message,
+                {"role": "user", "content": user_content},
+            ],
+            temperature=self.temperature,
+        )
+        content = response.choices[0].message.content.strip()
+        logger.debug("%s response content: %s", self.__class__.__name__, content)
+
+        if content:
+            self._cache.set(cache_key, content)
+            if embedding is not None:
+                self.semantic_cache.set(embedding, content)
+        return content
+
+    async def enhance_stream(
+        self, question: str, answer: str, strategy: str
+    ) -> AsyncIterator[str]:
+        """流式增强答案，逐段产出模型输出；缓存命中时一次性产出
+
+        与 enhance 共用精确匹配缓存与语义缓存，首尾空白同样去除，
+        产出拼接后与 enhance 的返回值一致
+        """
+        user_content, cache_key = self._render(question, answer, strategy)
+        content = self._cache.get(cache_key)
+        if content is not None:
+            yield content
+            return
+
+        embedding = None
+        if self.semantic_cache is not None:
+            embedding = await self.semantic_cache.embed(user_content)
+            content = self.semantic_cache.get(embedding)
+            if content is not None:
+                yield content
+                return
+
+        stream = await self.client.chat.completions.create(
+            model=self.llm_model,
+            messages=[
+                self._system_message,
+                {"role": "user", "content": user_content},
+            ],
+            temperature=self.temperature,
+            stream=True,
+        )
+        parts = []
+        # 开头的空白丢弃；尾部空白暂存，之后还有内容时再随下一段产出
+        started = False
+        trailing = ""
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                parts.append(delta)
+                if not started:
+                    delta = delta.lstrip()
+                    if not delta:
+                        continue
+                    started = True
+                text = trailing + delta
+                stripped = text.rstrip()
+                trailing = text[len(stripped) :]
+                if stripped:
+                    yield stripped
+        finally:
+            await stream.close()
+
+        content = "".join(parts).strip()
+        logger.debug("%s stream content: %s", self.__class__.__name__, content)
+        if content:
+            self._cache.set(cache_key, content)
+            if embedding is not None:
+                self.semantic_cache.set(embedding, content)
+
+    async def enhance_batch(self, items: list[tuple[str, str, str]]) -> list[str]:
+        """批量增强答案
+
+        多条 (question, answer, strategy) 合并为一次请求，系统提示词只发送一次；
+        输出条数不符或解析失败时回退为逐条增强。
+        """
+        results: list[str | None] = [None] * len(items)
+        pending: list[tuple[int, bytes, str]] = []
+        for index, (question, answer, strategy) in enumerate(items):
+            user_content, cache_key = self._render(question, answer, strategy)
+            results[index] = self._cache.get(cache_key)
+            if results[index] is None:
+                pending.append((index, cache_key, user_content))
+
+        if not pending:
+            return results
+
+        response = await self.client.chat.completions.create(
+            model=self.llm_model,
+            messages=[
+                self._batch_system_message,
                 {
                     "role": "user",
-                    "content": self.user_prompt.format(
-                        question=question, answer=answer, strategy=strategy
-                    ),
+                    "content": "\n".join(content for _, _, content in pending),
                 },
             ],
             temperature=self.temperature,
+            response_format={"type": "json_object"},
         )
         content = response.choices[0].message.content.strip()
-        logger.debug(f"{self.__class__.__name__} response content: {content}")
+        logger.debug(
+            "%s batch response content: %s", self.__class__.__name__, content
+        )
 
-        return content
+        try:
+            outputs = orjson.loads(content).get("outputs")
+        except (orjson.JSONDecodeError, AttributeError):
+            outputs = None
+        if not isinstance(outputs, list) or len(outputs) != len(pending):
+            logger.warning(
+                "%s batch response is invalid, falling back to per-item enhancement",
+                self.__class__.__name__,
+            )
+            outputs = await asyncio.gather(
+                *(self.enhance(*items[index]) for index, _, _ in pending)
+            )
+
+        for (index, cache_key, _), output in zip(pending, outputs):
+            output = output.strip() if isinstance(output, str) else ""
+            if output:
+                self._cache.set(cache_key, output)
+            results[index] = output
+        return results
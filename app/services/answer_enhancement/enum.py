@@ -1,4 +1,5 @@
 from enum import Enum
+from functools import lru_cache
 
 
 class EnhancementStrategy(Enum):
@@ -11,9 +12,19 @@ class EnhancementStrategy(Enum):
     @classmethod
     def get_strategy(cls, strategy: str) -> "EnhancementStrategy":
         """获取增强策略"""
-        return cls(strategy.lower())
+        return _strategy_of(strategy)
 
     @classmethod
-    def get_strategies_values(cls) -> list[str]:
+    def get_strategies_values(cls) -> tuple[str, ...]:
         """获取增强策略值"""
-        return [strategy.value for strategy in cls]
+        return _STRATEGY_VALUES
+
+
+# 策略值固定，模块加载时计算一次
+_STRATEGY_VALUES = tuple(strategy.value for strategy in EnhancementStrategy)
+
+
+@lru_cache(maxsize=8)
+def _strategy_of(strategy: str) -> EnhancementStrategy:
+    """按原始字符串缓存策略查找，无效值抛出的 ValueError 不会被缓存"""
+    return EnhancementStrategy(strategy.lower())
@@ -2,6 +2,7 @@ import logging
 
 from app.core.managers import async_job_manager
 from app.core.enum import JobStatus
+from app.core.workers import map_with_workers
 from .service import AnswerEnhancementService
 from .models import AnswerEnhancementRequest
 
@@ -20,33 +21,37 @@ async def enhance_answer(
         if isinstance(body, list):
             total = len(body)
             progress = 0
-            for idx, item in enumerate(body):
-                enhanced_answer = await service.execute(
-                    question=item["question"], answer=item["answer"]
-                )
-                enhanced_answers.append(enhanced_answer)
-                _progress = int((idx + 1) / total * 100)
+
+            async def update_progress(done: int) -> None:
+                nonlocal progress
+                _progress = int(done / total * 100)
                 if _progress > progress:
                     progress = _progress
-                    await async_job_manager.update_async_job(
-                        job_id,
-                        progress=progress,
-                    )
+                    await async_job_manager.update_async_job(job_id, progress=progress)
+
+            enhanced_answers = await map_with_workers(
+                lambda item: service.execute(
+                    question=item["question"], answer=item["answer"]
+                ),
+                body,
+                service.max_concurrency,
+                update_progress,
+            )
         else:
             enhanced_answer = await service.execute(
                 question=body["question"], answer=body["answer"]
             )
             enhanced_answers.append(enhanced_answer)
-            progress = 100
-            await async_job_manager.update_async_job(
-                job_id,
-                status=JobStatus.COMPLETED,
-                progress=progress,
-                result={
-                    "total": len(enhanced_answers),
-                    "enhanced_answers": enhanced_answers,
-                },
-            )
+
+        await async_job_manager.update_async_job(
+            job_id,
+            status=JobStatus.COMPLETED,
+            progress=100,
+            result={
+                "total": len(enhanced_answers),
+                "enhanced_answers": enhanced_answers,
+            },
+        )
 
     except Exception as e:
         logger.exception("Answer enhancement job %s failed", job_id, exc_info=True)
@@ -11,3 +11,5 @@ class AnswerEnhancementRequest(TypedDict):
 AnswerEnhancementRequestAdapter = TypeAdapter(
     AnswerEnhancementRequest | list[AnswerEnhancementRequest]
 )
+
+AnswerEnhancementItemAdapter = TypeAdapter(AnswerEnhancementRequest)
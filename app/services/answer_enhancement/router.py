@@ -1,15 +1,17 @@
 """答案增强服务路由"""
 
-import orjson
+from collections.abc import AsyncIterator
 from datetime import datetime
 
+import orjson
 from fastapi import APIRouter, Depends, Query, Request
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 
 from app.core.managers import async_job_manager
 from app.core.enum import JobType
+from app.core.responses import success_file_response, success_response
 from .jobs import enhance_answer
-from .models import AnswerEnhancementRequestAdapter
+from .models import AnswerEnhancementItemAdapter, AnswerEnhancementRequestAdapter
 from .service import AnswerEnhancementService
 from .deps import get_answer_enhancement_service
 
@@ -54,40 +56,59 @@ async def answer_enhancement(
     ```
     """
     body = AnswerEnhancementRequestAdapter.validate_json(await request.body())
-    enhanced_answers = []
 
     if isinstance(body, list):
-        for item in body:
-            enhanced_answer = await answer_enhancement_service.execute(
-                question=item["question"], answer=item["answer"]
-            )
-            enhanced_answers.append(enhanced_answer)
+        enhanced_answers = await answer_enhancement_service.execute_many(body)
     else:
         enhanced_answer = await answer_enhancement_service.execute(
             question=body["question"], answer=body["answer"]
         )
-        enhanced_answers.append(enhanced_answer)
+        enhanced_answers = [enhanced_answer]
 
-    content = orjson.dumps(
-        {
-            "code": 200,
-            "message": "success",
-            "data": {
-                "total": len(enhanced_answers),
-                "enhanced_answers": enhanced_answers,
-            },
-        }
-    )
+    data = {"total": len(enhanced_answers), "enhanced_answers": enhanced_answers}
 
     if return_file:
         filename = f"enhanced_answers_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
-        return Response(
-            content=content,
-            media_type="application/octet-stream",
-            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-        )
+        return success_file_response(data, filename)
     else:
-        return Response(content=content, media_type="application/json")
+        return success_response(data)
+
+
+@router.post("/stream/enhance")
+async def answer_enhancement_stream(
+    request: Request,
+    answer_enhancement_service: AnswerEnhancementService = Depends(
+        get_answer_enhancement_service
+    ),
+) -> StreamingResponse:
+    """对单个问答进行答案增强，以 SSE 流式返回增强结果。
+
+    ```
+    Args:
+        request: FastAPI 请求对象。
+
+    Request body (JSON schema):
+        {"question": "string", "answer": "string"}
+
+    Returns:
+        StreamingResponse: text/event-stream 响应。
+
+    Response body (SSE):
+        data: {"delta": "string"}
+        ...
+        data: [DONE]
+    ```
+    """
+    body = AnswerEnhancementItemAdapter.validate_json(await request.body())
+
+    async def events() -> AsyncIterator[bytes]:
+        async for delta in answer_enhancement_service.execute_stream(
+            question=body["question"], answer=body["answer"]
+        ):
+            yield b"data: " + orjson.dumps({"delta": delta}) + b"\n\n"
+        yield b"data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
 
 
 @router.post("/async/enhance")
@@ -96,7 +117,7 @@ async def answer_enhancement_async(
     answer_enhancement_service: AnswerEnhancementService = Depends(
         get_answer_enhancement_service
     ),
-) -> dict:
+) -> Response:
     """异步对单个或批量问答进行答案增强，返回任务 ID 供轮询结果。
 
     ```
@@ -108,7 +129,7 @@ async def answer_enhancement_async(
         批量: [{"question": "string", "answer": "string"}, ...]
 
     Returns:
-        dict: 响应体。
+        Response: 响应体。
 
     Response body (JSON schema):
         {"code": 200, "message": "success", "data": {"job_id": "string"}}
@@ -118,8 +139,4 @@ async def answer_enhancement_async(
     job_id = await async_job_manager.create_async_job(
         JobType.ANSWER_ENHANCEMENT, enhance_answer, body, answer_enhancement_service
     )
-    return {
-        "code": 200,
-        "message": "success",
-        "data": {"job_id": job_id},
-    }
+    return success_response({"job_id": job_id})
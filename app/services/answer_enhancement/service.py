@@ -1,14 +1,26 @@
+import asyncio
 import logging
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any
 
 from openai import AsyncOpenAI
+from prometheus_client import Counter
 
-from .checkers import LLMChecker
+from app.core.caches import SemanticCache
+from app.core.workers import map_with_workers
+
+from .checkers import LLMChecker, MLChecker
 from .enhancers import LLMEnhancer
 from .extractors import LLMExtractor
 from .enum import EnhancementStrategy
+from .models import AnswerEnhancementRequest
 
 logger = logging.getLogger(__name__)
 
+STRATEGY_COUNTER = Counter(
+    "answer_enhancement_strategy_total", "答案增强策略判定次数", ["strategy"]
+)
+
 
 class AnswerEnhancementService:
     """答案增强服务"""
@@ -20,44 +32,107 @@ class AnswerEnhancementService:
         checker_temperature: float,
         enhancer_temperature: float,
         extractor_temperature: float,
+        cache_capacity: int,
+        max_concurrency: int,
+        enhance_batch_size: int = 8,
+        sentence_transformer: Any | None = None,
+        semantic_cache_enabled: bool = False,
+        semantic_cache_threshold: float = 0.92,
+        semantic_cache_ttl: float = 3600,
+        semantic_cache_capacity: int = 4096,
+        ml_checker_weights: str = "",
+        ml_checker_threshold: float = 0.7,
     ):
-        """初始化答案增强服务"""
-        self.check_pipeline = [
-            LLMChecker(openai_client, llm_model, checker_temperature)
-        ]
-        self.enhance_pipeline = [
-            LLMEnhancer(openai_client, llm_model, enhancer_temperature)
-        ]
-        self.extract_pipeline = [
-            LLMExtractor(openai_client, llm_model, extractor_temperature)
-        ]
+        """初始化答案增强服务
+
+        各流水线在初始化时绑定为方法元组，调用时不再逐次查找属性；
+        启用语义缓存时为增强器与提取器分别创建缓存；
+        配置本地分类器权重时，策略判断先走本地分类器，置信度不足再调用 LLM
+        """
+
+        def semantic_cache() -> SemanticCache | None:
+            if sentence_transformer is None or not semantic_cache_enabled:
+                return None
+            return SemanticCache(
+                sentence_transformer,
+                semantic_cache_threshold,
+                semantic_cache_ttl,
+                semantic_cache_capacity,
+            )
+
+        llm_checker = LLMChecker(
+            openai_client, llm_model, checker_temperature, cache_capacity
+        )
+        if sentence_transformer is not None and ml_checker_weights:
+            ml_checker = MLChecker(
+                sentence_transformer, ml_checker_weights, ml_checker_threshold
+            )
+            self.check_pipeline: tuple[Callable[[str, str], Awaitable[str]], ...] = (
+                ml_checker.check,
+                llm_checker.check,
+            )
+        else:
+            self.check_pipeline = (llm_checker.check,)
+        enhancer = LLMEnhancer(
+            openai_client,
+            llm_model,
+            enhancer_temperature,
+            cache_capacity,
+            semantic_cache(),
+        )
+        self.enhance_pipeline: tuple[
+            Callable[[str, str, str], Awaitable[str]], ...
+        ] = (enhancer.enhance,)
+        self._enhance_batch = enhancer.enhance_batch
+        self._enhance_stream = enhancer.enhance_stream
+        self.enhance_batch_size = enhance_batch_size
+        self.extract_pipeline: tuple[Callable[[str, str], Awaitable[str]], ...] = (
+            LLMExtractor(
+                openai_client,
+                llm_model,
+                extractor_temperature,
+                cache_capacity,
+                semantic_cache(),
+            ).extract,
+        )
+        # 服务为应用级单例，信号量限制所有批量请求的总并发，避免触发模型限流
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
 
     async def _check(self, question: str, answer: str) -> EnhancementStrategy:
         """策略判断"""
-        for checker in self.check_pipeline:
-            strategy = await checker.check(question, answer)
+        for check in self.check_pipeline:
+            strategy = await check(question, answer)
+            # 空结果表示该检查器无法判断，交由下一个检查器
+            if not strategy:
+                continue
             try:
                 strategy = EnhancementStrategy.get_strategy(strategy)
-                return strategy
+                break
             except ValueError:
                 logger.error(
-                    f"{checker.__class__.__name__} strategy is not a valid strategy: {strategy}"
+                    "%s strategy is not a valid strategy: %s",
+                    check.__qualname__,
+                    strategy,
                 )
+        else:
+            strategy = EnhancementStrategy.DIRECT
 
-        return EnhancementStrategy.DIRECT
+        STRATEGY_COUNTER.labels(strategy.value).inc()
+        return strategy
 
     async def _enhance(self, question: str, answer: str, strategy: str) -> str:
         """根据策略增强答案"""
-        for enhancer in self.enhance_pipeline:
-            enhanced_answer = await enhancer.enhance(question, answer, strategy)
+        for enhance in self.enhance_pipeline:
+            enhanced_answer = await enhance(question, answer, strategy)
             if enhanced_answer:
                 return enhanced_answer
         return answer
 
     async def _extract(self, question: str, answer: str) -> str:
         """提取图片/视频描述文本"""
-        for extractor in self.extract_pipeline:
-            extracted_answer = await extractor.extract(question, answer)
+        for extract in self.extract_pipeline:
+            extracted_answer = await extract(question, answer)
             if extracted_answer:
                 return extracted_answer
         return ""
@@ -65,9 +140,136 @@ class AnswerEnhancementService:
     async def execute(self, question: str, answer: str) -> str:
         """策略判断并增强答案"""
         strategy = await self._check(question, answer)
-        enhanced_answer = await self._enhance(question, answer, strategy.value)
+        # DIRECT 策略直接使用原始答案，无需再调用模型
+        if strategy == EnhancementStrategy.DIRECT:
+            return answer
         if strategy == EnhancementStrategy.GUIDANCE:
-            guidance_answer = await self._extract(question, answer)
+            # 提取只依赖原始问答，与增强并发执行
+            enhanced_answer, guidance_answer = await asyncio.gather(
+                self._enhance(question, answer, strategy.value),
+                self._extract(question, answer),
+            )
             return f"{enhanced_answer}[{guidance_answer}]"
 
-        return enhanced_answer
+        return await self._enhance(question, answer, strategy.value)
+
+    async def execute_stream(self, question: str, answer: str) -> AsyncIterator[str]:
+        """策略判断并流式产出增强答案，GUIDANCE 策略最后产出并发提取的描述文本"""
+        strategy = await self._check(question, answer)
+        if strategy == EnhancementStrategy.DIRECT:
+            yield answer
+            return
+
+        # GUIDANCE 策略在流式增强开始前启动提取，与增强输出并发执行
+        extract_task = (
+            asyncio.create_task(self._extract(question, answer))
+            if strategy == EnhancementStrategy.GUIDANCE
+            else None
+        )
+        try:
+            produced = False
+            async for delta in self._enhance_stream(question, answer, strategy.value):
+                produced = True
+                yield delta
+            if not produced:
+                yield answer
+
+            if extract_task is not None:
+                yield f"[{await extract_task}]"
+        finally:
+            # 客户端断开或增强出错时取消未完成的提取
+            if extract_task is not None and not extract_task.done():
+                extract_task.cancel()
+
+    async def _execute_limited(self, question: str, answer: str) -> str:
+        """在并发限制内执行单条增强"""
+        async with self._semaphore:
+            return await self.execute(question, answer)
+
+    async def _check_limited(self, question: str, answer: str) -> EnhancementStrategy:
+        """在并发限制内执行策略判断"""
+        async with self._semaphore:
+            return await self._check(question, answer)
+
+    async def _extract_limited(self, question: str, answer: str) -> str:
+        """在并发限制内提取图片/视频描述文本"""
+        async with self._semaphore:
+            return await self._extract(question, answer)
+
+    async def _enhance_chunk(
+        self, items: list[AnswerEnhancementRequest], strategies: list[str]
+    ) -> list[str]:
+        """在并发限制内批量增强一组问答，空结果回退为原始答案"""
+        async with self._semaphore:
+            enhanced_answers = await self._enhance_batch(
+                [
+                    (item["question"], item["answer"], strategy)
+                    for item, strategy in zip(items, strategies)
+                ]
+            )
+        return [
+            enhanced_answer or item["answer"]
+            for item, enhanced_answer in zip(items, enhanced_answers)
+        ]
+
+    async def execute_many(self, items: list[AnswerEnhancementRequest]) -> list[str]:
+        """并发增强多条问答，结果顺序与输入一致
+
+        逐条调用经由有界队列分发给 max_concurrency 个 worker，不为每条预先创建协程；
+        增强按 enhance_batch_size 分组合并请求，与 GUIDANCE 条目的描述提取并发执行。
+        """
+        if self.enhance_batch_size <= 1:
+            return await map_with_workers(
+                lambda item: self._execute_limited(item["question"], item["answer"]),
+                items,
+                self.max_concurrency,
+            )
+
+        strategies = await map_with_workers(
+            lambda item: self._check_limited(item["question"], item["answer"]),
+            items,
+            self.max_concurrency,
+        )
+        # DIRECT 条目保留原始答案，只对其余条目分组批量增强
+        enhanced_answers = [item["answer"] for item in items]
+        enhance_indexes = [
+            index
+            for index, strategy in enumerate(strategies)
+            if strategy != EnhancementStrategy.DIRECT
+        ]
+        guidance_indexes = [
+            index
+            for index, strategy in enumerate(strategies)
+            if strategy == EnhancementStrategy.GUIDANCE
+        ]
+
+        size = self.enhance_batch_size
+        index_chunks = [
+            enhance_indexes[start : start + size]
+            for start in range(0, len(enhance_indexes), size)
+        ]
+        chunks, guidance_answers = await asyncio.gather(
+            asyncio.gather(
+                *(
+                    self._enhance_chunk(
+                        [items[index] for index in index_chunk],
+                        [strategies[index].value for index in index_chunk],
+                    )
+                    for index_chunk in index_chunks
+                )
+            ),
+            map_with_workers(
+                lambda index: self._extract_limited(
+                    items[index]["question"], items[index]["answer"]
+                ),
+                guidance_indexes,
+                self.max_concurrency,
+            ),
+        )
+
+        for index_chunk, chunk in zip(index_chunks, chunks):
+            for index, enhanced_answer in zip(index_chunk, chunk):
+                enhanced_answers[index] = enhanced_answer
+        for index, guidance_answer in zip(guidance_indexes, guidance_answers):
+            enhanced_answers[index] = f"{enhanced_answers[index]}[{guidance_answer}]"
+        return enhanced_answers
@@ -22,6 +22,7 @@ class QAGenerationServiceSettings(BaseSettings):
     generator_temperature: float = Field(default=0.3, description="生成器温度")
     filter_temperature: float = Field(default=0.01, description="过滤器温度")
     semantic_threshold: float = Field(default=0.88, description="语义阈值")
+    semantic_batch_size: int = Field(default=64, description="语义去重编码批大小")
     filter_rules: list[dict] = Field(
         default=[
             {
@@ -37,6 +38,38 @@ class QAGenerationServiceSettings(BaseSettings):
         description="过滤规则",
     )
     max_context_length: int = Field(default=32 * 1024, description="最大上下文长度")
+    max_context_tokens: int = Field(
+        default=0, description="最大上下文 token 数，0 表示不限制；需安装 tiktoken"
+    )
+    max_concurrency: int = Field(default=8, description="生成与过滤最大并发数")
+    distilled_filter_path: str = Field(
+        default="", description="蒸馏过滤器权重文件(.npz)路径，为空时不启用"
+    )
+    distilled_filter_confidence: float = Field(
+        default=0.9, description="蒸馏过滤器直接判定所需的置信度，低于该值时调用LLM过滤"
+    )
+
+    # 缓存配置
+    cache_capacity: int = Field(default=4096, description="LLM结果缓存容量")
+    semantic_cache_enabled: bool = Field(
+        default=False, description="是否启用生成/过滤结果语义缓存"
+    )
+    semantic_cache_threshold: float = Field(
+        default=0.95, description="语义缓存命中相似度阈值"
+    )
+    semantic_cache_ttl: float = Field(default=3600, description="语义缓存有效期(秒)")
+    semantic_cache_capacity: int = Field(default=4096, description="语义缓存容量")
+
+    # Batch API 配置
+    batch_enabled: bool = Field(
+        default=False, description="异步任务是否通过 Batch API 提交生成与过滤请求"
+    )
+    batch_threshold: int = Field(
+        default=100, description="上下文数不少于该值时才使用 Batch API"
+    )
+    batch_poll_interval: float = Field(
+        default=30, description="Batch API 任务状态轮询间隔(秒)"
+    )
 
 
 qa_generation_service_settings = QAGenerationServiceSettings()
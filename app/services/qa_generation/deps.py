@@ -5,12 +5,31 @@ from .config import qa_generation_service_settings
 
 
 def get_qa_generation_service(request: Request) -> QAGenerationService:
-    return QAGenerationService(
-        request.app.state.openai_client,
-        request.app.state.sentence_transformer,
-        qa_generation_service_settings.llm_model,
-        qa_generation_service_settings.generator_temperature,
-        qa_generation_service_settings.filter_temperature,
-        qa_generation_service_settings.semantic_threshold,
-        qa_generation_service_settings.filter_rules,
-    )
+    # 服务无请求级状态，首次使用时创建并缓存在 app.state 上，缓存随之跨请求生效
+    service = getattr(request.app.state, "qa_generation_service", None)
+    if service is None:
+        service = QAGenerationService(
+            request.app.state.openai_client,
+            request.app.state.sentence_transformer,
+            qa_generation_service_settings.llm_model,
+            qa_generation_service_settings.generator_temperature,
+            qa_generation_service_settings.filter_temperature,
+            qa_generation_service_settings.semantic_threshold,
+            qa_generation_service_settings.filter_rules,
+            qa_generation_service_settings.semantic_batch_size,
+            qa_generation_service_settings.max_concurrency,
+            qa_generation_service_settings.cache_capacity,
+            qa_generation_service_settings.semantic_cache_enabled,
+            qa_generation_service_settings.semantic_cache_threshold,
+            qa_generation_service_settings.semantic_cache_ttl,
+            qa_generation_service_settings.semantic_cache_capacity,
+            qa_generation_service_settings.batch_enabled,
+            qa_generation_service_settings.batch_threshold,
+            qa_generation_service_settings.batch_poll_interval,
+            qa_generation_service_settings.max_context_length,
+            qa_generation_service_settings.max_context_tokens,
+            qa_generation_service_settings.distilled_filter_path,
+            qa_generation_service_settings.distilled_filter_confidence,
+        )
+        request.app.state.qa_generation_service = service
+    return service
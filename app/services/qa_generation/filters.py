@@ -1,12 +1,66 @@
 import re
-import json
+import asyncio
+import hashlib
 import logging
+import textwrap
 from abc import ABC, abstractmethod
+from collections.abc import Callable
+from functools import lru_cache
+from typing import Any
 
+import numpy as np
+import orjson
 from openai import AsyncOpenAI
+from sentence_transformers import SentenceTransformer
+
+from app.core.batches import BatchLLMClient
+from app.core.caches import LRUCache, SemanticCache
 
 logger = logging.getLogger(__name__)
 
+# 规则条件键与QA对字段的对应关系
+RULE_CONDITION_FIELDS = (
+    ("question_condition", "question"),
+    ("answer_condition", "answer"),
+    ("intent_condition", "intent"),
+)
+# 含编号或命名反向引用的条件合并后分组会错位，需单独编译
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+
+def _fuse_conditions(patterns: list[str]) -> re.Pattern:
+    """将同一字段的多个条件合并为一个正则，需在位置 0 处 match
+
+    每个条件包装为 (?=[\\s\\S]*?(?:p))，该前瞻成立当且仅当 re.search(p) 能匹配，
+    多个前瞻串联即为全部条件同时成立，一次调用完成该字段的所有判断
+    """
+    return re.compile(
+        "".join(f"(?=[\\s\\S]*?(?:{pattern}))" for pattern in patterns), re.I
+    )
+
+
+@lru_cache(maxsize=32)
+def _compile_rules(rules_key: bytes) -> tuple[tuple[str, Callable[[str], Any]], ...]:
+    """编译规则集，返回 (字段, 绑定的 match 方法) 元组
+
+    以规则集的规范化 JSON 为键缓存，相同规则集的过滤器实例共享编译结果
+    """
+    rules = orjson.loads(rules_key)
+    matchers: list[tuple[str, Callable[[str], Any]]] = []
+    for condition, field in RULE_CONDITION_FIELDS:
+        patterns = [rule[condition] for rule in rules if rule.get(condition)]
+        fusible = [p for p in patterns if not _BACKREFERENCE.search(p)]
+        separate = [p for p in patterns if _BACKREFERENCE.search(p)]
+        if fusible:
+            try:
+                matchers.append((field, _fuse_conditions(fusible).match))
+            except re.error:
+                # 内联全局标志 (?i)、跨规则重复的命名分组等无法合并，该字段逐条编译
+                separate = patterns
+        # 单独编译的条件与原始语义一致：re.search 且忽略大小写
+        matchers.extend((field, re.compile(p, re.I).search) for p in separate)
+    return tuple(matchers)
+
 
 class Filter(ABC):
     """过滤器抽象基类"""
@@ -21,153 +75,314 @@ class RuleFilter(Filter):
     """规则过滤器"""
 
     def __init__(self, rules: list[dict]):
-        """初始化规则过滤器"""
+        """初始化规则过滤器
+
+        所有规则为与关系，按字段归并各规则的条件并预编译为一个正则，
+        每个字段只需扫描一次；条件针对具体字段(含 ^ 锚点)，不能拼接字段后统一匹配。
+        保存绑定的 match 方法，过滤时不再逐次查找属性；编译结果按规则集跨实例缓存
+        """
         self.rules = rules
+        self._field_matchers = _compile_rules(
+            orjson.dumps(rules, option=orjson.OPT_SORT_KEYS)
+        )
 
-    async def filter(self, qa_pair: dict) -> bool:
-        """过滤QA对"""
-        for rule in self.rules:
-            if rule.get("question_condition") and not re.search(
-                rule.get("question_condition"), qa_pair["question"], re.I
-            ):
-                return False
-            if rule.get("answer_condition") and not re.search(
-                rule.get("answer_condition"), qa_pair["answer"], re.I
-            ):
-                return False
-            if rule.get("intent_condition") and not re.search(
-                rule.get("intent_condition"), qa_pair["intent"], re.I
-            ):
+    def filter(self, qa_pair: dict) -> bool:
+        """过滤QA对，纯正则匹配无 I/O，同步执行，任一字段不满足即返回"""
+        for field, match in self._field_matchers:
+            if match(qa_pair[field]) is None:
                 return False
         return True
 
+    def filter_batch(self, columns: dict[str, list[str]]) -> np.ndarray:
+        """按列批量过滤，columns 为字段到各QA对该字段取值的映射，返回保留掩码"""
+        keeps = np.ones(len(next(iter(columns.values()), ())), dtype=bool)
+        for field, match in self._field_matchers:
+            keeps &= np.fromiter(map(match, columns[field]), dtype=bool, count=len(keeps))
+        return keeps
+
 
 class LLMFilter(Filter):
     """LLM过滤器"""
 
-    system_prompt: str = """
-    <role>
-    你是一个问答对质量筛选专家，专注于判断问答对是否适合作为产品知识库的长期有效内容。
-    </role>
-
-    <task>
-    你的任务是对给定的问答对进行双重筛选:
-    1. 判断问答对是否与提供的产品型号列表相关
-    2. 判断问答对是否包含时效性信息（如价格、库存、促销等），这类内容不适合沉淀为知识库
-    只有同时通过两项筛选的问答对才应被保留。
-    </task>
-
-    <input_format>
-    你将收到以下输入:
-    1. 产品型号列表：一个包含多个产品型号的列表
-    2. 问答对：格式为 {"question": "xx", "answer": "xx", "intent": "xx"}
-    </input_format>
-
-    <判断标准>
-
-    【相关性判断】
-    问答对与产品列表"相关"的情况包括:
-    - 问题或答案中直接提到了列表中的产品型号（完全匹配或部分匹配）
-    - 问题或答案描述的功能、特性、问题明确对应列表中的某个产品
-    - 问题或答案中提到的产品系列、产品线属于列表中的产品范围
-    - 问答内容是关于列表中产品的使用、故障、配置、参数等
-
-    问答对与产品列表"不相关"的情况包括:
-    - 提到的产品型号完全不在列表中
-    - 是关于其他品牌或完全不同类型的产品
-    - 是通用性问题，没有特定产品指向
-    - 产品型号相似但明确是不同型号（需仔细比对）
-
-    【时效性判断】
-    以下类型的问答对属于"时效性内容"，应被过滤（keep: false）:
-    - 价格类：询问或回答产品售价、报价、降价、涨价等
-    - 促销类：优惠活动、折扣、满减、限时特价、赠品等
-    - 库存类：是否有货、库存数量、补货时间、缺货通知等
-    - 物流类：发货时间、快递状态、预计到达等
-    - 政策类：退换货政策（如涉及具体时间节点或活动期间）、当前售后活动等
-    - 渠道类：某平台是否在售、某店铺的特殊活动等
-
-    以下内容不属于时效性内容，应正常保留:
-    - 产品功能、规格、参数说明
-    - 产品使用方法、操作指引
-    - 常见故障排查与解决方案
-    - 产品对比与选购建议（不涉及具体价格）
-    - 通用售后政策（如保修期限、维修流程等固定政策）
-
-    </判断标准>
-
-    <reasoning_process>
-    在做出判断前，请按以下步骤思考:
-    1. 提取问答对中提到的所有产品型号、产品名称或产品特征
-    2. 将提取的信息与产品列表逐一比对，判断相关性
-    3. 检查问答对是否包含价格、促销、库存、物流等时效性信息
-    4. 综合两项判断得出最终结论
-    5. 简洁说明判断理由（需同时说明相关性和时效性的判断依据）
-    </reasoning_process>
-
-    <output_format>
-    请严格按照以下JSON格式输出，不要包含其他内容:
-    {
-      "keep": true/false,
-      "reason": "简洁说明判断理由，指出相关性结论和时效性结论"
-    }
-
-    示例:
-    - 产品相关且无时效性: {"keep": true, "reason": "问答提到产品型号X100在列表中存在，内容为使用说明，无时效性信息"}
-    - 产品相关但含时效性: {"keep": false, "reason": "问答提到X100在列表中存在，但内容涉及促销优惠，属于时效性信息"}
-    - 产品不相关: {"keep": false, "reason": "问答提到产品型号Y200，不在提供的产品列表中"}
-    </output_format>
-
-    <注意事项>
-    - 相关性边界情况：如果不确定是否相关，倾向于保留（keep: true）
-    - 时效性边界情况：如果问答核心价值是产品知识而非时效信息（如"这款手机大概多少钱"的回答中顺带提到功能），优先保留
-    - 注意产品型号的变体和简称
-    - 理由需要具体，同时覆盖相关性和时效性两个维度
-    - 严格输出JSON格式，确保可被程序解析
-    </注意事项>
-
-    <产品型号列表>
-    IVERTU
-    METAVERTU
-    METAVERTU 2
-    SIGNATURE 4G
-    SIGNATURE S
-    VERTU AGENT Q
-    VERTU QUANTUM
-    </产品型号列表>
-    """
+    system_prompt: str = textwrap.dedent(
+        """
+        <role>
+        你是一个问答对质量筛选专家，专注于判断问答对是否适合作为产品知识库的长期有效内容。
+        </role>
 
-    user_prompt: str = """
-    <input>
-    - 问答对: {qa_pair}
-    </input>
-    """
+        <task>
+        你的任务是对给定的问答对进行双重筛选:
+        1. 判断问答对是否与提供的产品型号列表相关
+        2. 判断问答对是否包含时效性信息（如价格、库存、促销等），这类内容不适合沉淀为知识库
+        只有同时通过两项筛选的问答对才应被保留。
+        </task>
+
+        <input_format>
+        你将收到以下输入:
+        1. 产品型号列表：一个包含多个产品型号的列表
+        2. 问答对：格式为 {"question": "xx", "answer": "xx", "intent": "xx"}
+        </input_format>
+
+        <判断标准>
+
+        【相关性判断】
+        问答对与产品列表"相关"的情况包括:
+        - 问题或答案中直接提到了列表中的产品型号（完全匹配或部分匹配）
+        - 问题或答案描述的功能、特性、问题明确对应列表中的某个产品
+        - 问题或答案中提到的产品系列、产品线属于列表中的产品范围
+        - 问答内容是关于列表中产品的使用、故障、配置、参数等
+
+        问答对与产品列表"不相关"的情况包括:
+        - 提到的产品型号完全不在列表中
+        - 是关于其他品牌或完全不同类型的产品
+        - 是通用性问题，没有特定产品指向
+        - 产品型号相似但明确是不同型号（需仔细比对）
+
+        【时效性判断】
+        以下类型的问答对属于"时效性内容"，应被过滤（keep: false）:
+        - 价格类：询问或回答产品售价、报价、降价、涨价等
+        - 促销类：优惠活动、折扣、满减、限时特价、赠品等
+        - 库存类：是否有货、库存数量、补货时间、缺货通知等
+        - 物流类：发货时间、快递状态、预计到达等
+        - 政策类：退换货政策（如涉及具体时间节点或活动期间）、当前售后活动等
+        - 渠道类：某平台是否在售、某店铺的特殊活动等
+
+        以下内容不属于时效性内容，应正常保留:
+        - 产品功能、规格、参数说明
+        - 产品使用方法、操作指引
+        - 常见故障排查与解决方案
+        - 产品对比与选购建议（不涉及具体价格）
+        - 通用售后政策（如保修期限、维修流程等固定政策）
+
+        </判断标准>
+
+        <reasoning_process>
+        在做出判断前，请按以下步骤思考:
+        1. 提取问答对中提到的所有产品型号、产品名称或产品特征
+        2. 将提取的信息与产品列表逐一比对，判断相关性
+        3. 检查问答对是否包含价格、促销、库存、物流等时效性信息
+        4. 综合两项判断得出最终结论
+        5. 简洁说明判断理由（需同时说明相关性和时效性的判断依据）
+        </reasoning_process>
+
+        <output_format>
+        请严格按照以下JSON格式输出，不要包含其他内容:
+        {
+          "keep": true/false,
+          "reason": "简洁说明判断理由，指出相关性结论和时效性结论"
+        }
+
+        示例:
+        - 产品相关且无时效性: {"keep": true, "reason": "问答提到产品型号X100在列表中存在，内容为使用说明，无时效性信息"}
+        - 产品相关但含时效性: {"keep": false, "reason": "问答提到X100在列表中存在，但内容涉及促销优惠，属于时效性信息"}
+        - 产品不相关: {"keep": false, "reason": "问答提到产品型号Y200，不在提供的产品列表中"}
+        </output_format>
+
+        <注意事项>
+        - 相关性边界情况：如果不确定是否相关，倾向于保留（keep: true）
+        - 时效性边界情况：如果问答核心价值是产品知识而非时效信息（如"这款手机大概多少钱"的回答中顺带提到功能），优先保留
+        - 注意产品型号的变体和简称
+        - 理由需要具体，同时覆盖相关性和时效性两个维度
+        - 严格输出JSON格式，确保可被程序解析
+        </注意事项>
+
+        <产品型号列表>
+        IVERTU
+        METAVERTU
+        METAVERTU 2
+        SIGNATURE 4G
+        SIGNATURE S
+        VERTU AGENT Q
+        VERTU QUANTUM
+        </产品型号列表>
+        """
+    ).strip()
+
+    user_prompt: str = textwrap.dedent(
+        """
+        <input>
+        - 问答对: {qa_pair}
+        </input>
+        """
+    ).strip()
 
-    def __init__(self, openai_client: AsyncOpenAI, llm_model: str, temperature: float):
+    def __init__(
+        self,
+        openai_client: AsyncOpenAI,
+        llm_model: str,
+        temperature: float,
+        cache_capacity: int = 4096,
+        semantic_cache: SemanticCache | None = None,
+    ):
         """初始化LLM过滤器"""
         self.client = openai_client
         self.llm_model = llm_model
         self.temperature = temperature
+        self.semantic_cache = semantic_cache
+        self._cache = LRUCache(cache_capacity)
+        self._system_message = {"role": "system", "content": self.system_prompt}
 
-    async def filter(self, qa_pair: dict) -> bool:
-        """过滤QA对"""
-        response = await self.client.chat.completions.create(
-            model=self.llm_model,
-            messages=[
-                {"role": "system", "content": self.system_prompt},
-                {"role": "user", "content": self.user_prompt.format(qa_pair=qa_pair)},
-            ],
-            temperature=self.temperature,
+    def _render(self, qa_pair: dict) -> tuple[str, bytes]:
+        """渲染用户提示词，返回提示词与缓存键"""
+        # 以 JSON 而非 Python repr 序列化QA对，与提示词中的输入格式一致且更紧凑
+        user_content = self.user_prompt.format_map(
+            {"qa_pair": orjson.dumps(qa_pair).decode()}
         )
-        content = response.choices[0].message.content.strip()
-        logger.debug(f"{self.__class__.__name__} response content: {content}")
+        return user_content, hashlib.blake2b(
+            user_content.encode(), digest_size=16
+        ).digest()
+
+    def _request_body(self, user_content: str) -> dict:
+        """构造 chat.completions 请求体，实时调用与批量调用共用"""
+        return {
+            "model": self.llm_model,
+            "messages": [
+                self._system_message,
+                {"role": "user", "content": user_content},
+            ],
+            "temperature": self.temperature,
+        }
+
+    def _parse(self, content: str) -> bool | None:
+        """解析模型输出，解析失败时返回 None"""
+        content = content.strip()
+        logger.debug("%s response content: %s", self.__class__.__name__, content)
 
         try:
-            filter_result = json.loads(content)
-        except json.JSONDecodeError:
+            filter_result = orjson.loads(content)
+        except orjson.JSONDecodeError:
             logger.error(
-                f"{self.__class__.__name__} response content is not a valid JSON: {content}"
+                "%s response content is not a valid JSON: %s",
+                self.__class__.__name__,
+                content,
             )
-            return True
+            return None
 
         return filter_result.get("keep", True)
+
+    async def filter(self, qa_pair: dict) -> bool:
+        """过滤QA对，先查精确匹配缓存，再查语义缓存"""
+        user_content, cache_key = self._render(qa_pair)
+        keep = self._cache.get(cache_key)
+        if keep is not None:
+            return keep
+
+        embedding = None
+        if self.semantic_cache is not None:
+            embedding = await self.semantic_cache.embed(user_content)
+            keep = self.semantic_cache.get(embedding)
+            if keep is not None:
+                return keep
+
+        response = await self.client.chat.completions.create(
+            **self._request_body(user_content)
+        )
+        keep = self._parse(response.choices[0].message.content)
+        # 解析失败时保留QA对，但不缓存
+        if keep is None:
+            return True
+        if logger.isEnabledFor(logging.DEBUG):
+            # 过滤结果样本，可用于训练 DistilledFilter
+            logger.debug(
+                "%s sample: %s",
+                self.__class__.__name__,
+                orjson.dumps({"qa_pair": qa_pair, "keep": keep}).decode(),
+            )
+
+        self._cache.set(cache_key, keep)
+        if embedding is not None:
+            self.semantic_cache.set(embedding, keep)
+        return keep
+
+    async def filter_batch(
+        self, qa_pairs: list[dict], batch_client: BatchLLMClient
+    ) -> list[bool | None]:
+        """通过 Batch API 批量过滤QA对
+
+        只查精确匹配缓存，未命中的QA对合并为一个批任务；
+        批任务未返回结果的位置为 None，由调用方回退为实时调用。
+        """
+        results: list[bool | None] = [None] * len(qa_pairs)
+        pending: list[tuple[int, bytes, str]] = []
+        for index, qa_pair in enumerate(qa_pairs):
+            user_content, cache_key = self._render(qa_pair)
+            results[index] = self._cache.get(cache_key)
+            if results[index] is None:
+                pending.append((index, cache_key, user_content))
+
+        contents = await batch_client.complete(
+            [self._request_body(user_content) for _, _, user_content in pending]
+        )
+        for (index, cache_key, _), content in zip(pending, contents):
+            if content is None:
+                continue
+            keep = self._parse(content)
+            if keep is None:
+                results[index] = True
+                continue
+            self._cache.set(cache_key, keep)
+            results[index] = keep
+        return results
+
+
+class DistilledFilter(Filter):
+    """蒸馏过滤器
+
+    以 LLM 过滤结果训练的逻辑回归分类器，输入为问答文本的归一化句向量。
+    置信度足够时直接给出结论，否则回退到 LLM 过滤器，只有不确定的QA对才调用模型。
+    """
+
+    def __init__(
+        self,
+        sentence_transformer: SentenceTransformer,
+        weights_path: str,
+        fallback: LLMFilter,
+        confidence: float = 0.9,
+    ):
+        """初始化蒸馏过滤器
+
+        Args:
+            sentence_transformer: 句向量模型，需与训练时一致
+            weights_path: scripts/train_distilled_filter.py 生成的权重文件(.npz)
+            fallback: 不确定时使用的LLM过滤器
+            confidence: 保留概率不低于 confidence 或不高于 1 - confidence 时直接判定
+        """
+        self.sentence_transformer = sentence_transformer
+        self.fallback = fallback
+        self.confidence = confidence
+        with np.load(weights_path) as weights:
+            self._weight = weights["weight"].astype(np.float32)
+            self._bias = float(weights["bias"])
+
+    @staticmethod
+    def _texts(qa_pairs: list[dict]) -> list[str]:
+        """拼接问答文本"""
+        return [f"{qa_pair['question']} {qa_pair['answer']}" for qa_pair in qa_pairs]
+
+    def _encode(self, qa_pairs: list[dict]) -> np.ndarray:
+        """计算归一化句向量"""
+        return self.sentence_transformer.encode(
+            self._texts(qa_pairs), convert_to_numpy=True, normalize_embeddings=True
+        )
+
+    async def predict_batch(self, qa_pairs: list[dict]) -> list[bool | None]:
+        """批量判定，一次编码全部QA对，不确定的位置为 None"""
+        if not qa_pairs:
+            return []
+        embeddings = await asyncio.to_thread(self._encode, qa_pairs)
+        probabilities = 1.0 / (1.0 + np.exp(-(embeddings @ self._weight + self._bias)))
+        return [
+            True
+            if probability >= self.confidence
+            else False
+            if probability <= 1.0 - self.confidence
+            else None
+            for probability in probabilities.tolist()
+        ]
+
+    async def filter(self, qa_pair: dict) -> bool:
+        """过滤QA对，分类器不确定时交给LLM过滤器"""
+        (keep,) = await self.predict_batch([qa_pair])
+        if keep is None:
+            return await self.fallback.filter(qa_pair)
+        return keep
@@ -1,9 +1,23 @@
-import json
+import asyncio
+import hashlib
 import logging
+import textwrap
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
+from functools import cached_property
 
+import orjson
 from openai import AsyncOpenAI
 
+from app.core.batches import BatchLLMClient
+from app.core.caches import LRUCache, SemanticCache
+from app.core.parsers import JSONArrayScanner
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken 为可选依赖，未安装时只按字符数截断
+    tiktoken = None
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,244 +33,419 @@ class QAGenerator(ABC):
 class LLMQAGenerator(QAGenerator):
     """LLM QA对生成器"""
 
-    system_prompt: str = """
-    # 客服对话有效问答提取任务
-
-    ## 一、角色定义
-    你是一个专业的**客服对话数据分析专家**。
+    system_prompt: str = textwrap.dedent(
+        """
+        # 客服对话有效问答提取任务
 
-    ## 二、任务描述
-    你的任务是从客服与客户的对话记录中提取有价值的问答对。
-
-    ## 三、核心原则
-
-    ### 问题完整性要求（必须同时满足）
-    ✓ **无指代词** - 不得出现"这/那/它/该/刚才"等  
-    ✓ **包含具体实体** - 必须有产品型号/订单号/服务名称  
-    ✓ **独立可理解** - 脱离上下文仍可完全理解  
-    ✓ **指代可还原** - 无法还原则判定无效
+        ## 一、角色定义
+        你是一个专业的**客服对话数据分析专家**。
+
+        ## 二、任务描述
+        你的任务是从客服与客户的对话记录中提取有价值的问答对。
+
+        ## 三、核心原则
+
+        ### 问题完整性要求（必须同时满足）
+        ✓ **无指代词** - 不得出现"这/那/它/该/刚才"等  
+        ✓ **包含具体实体** - 必须有产品型号/订单号/服务名称  
+        ✓ **独立可理解** - 脱离上下文仍可完全理解  
+        ✓ **指代可还原** - 无法还原则判定无效
 
-    ### 有效性判定标准
-    ✓ 问题有明确咨询意图  
-    ✓ 客服给出实质性答复（非"请稍等"）  
-    ✓ 问答内容匹配  
-    ✓ 符合问题完整性要求
-
-    ---
+        ### 有效性判定标准
+        ✓ 问题有明确咨询意图  
+        ✓ 客服给出实质性答复（非"请稍等"）  
+        ✓ 问答内容匹配  
+        ✓ 符合问题完整性要求
+
+        ---
 
-    ## 四、输入输出格式
+        ## 四、输入输出格式
 
-    **输入:**
-    1. 客户: 消息内容
-    2. 客服: 消息内容
-    ...
+        **输入:**
+        1. 客户: 消息内容
+        2. 客服: 消息内容
+        ...
 
-    **输出:**
-    [{"question": "完整问题", "answer": "标准化答案", "intent": "意图分类"}]
+        **输出:**
+        [{"question": "完整问题", "answer": "标准化答案", "intent": "意图分类"}]
 
-    ---
+        ---
 
-    ## 五、提取规则
-
-    ### 5.1 有效性识别
-
-    **提取的问题:**
-    - 明确咨询意图（如何/能否/什么/有没有）
-    - 具体需求表达（我想要/需要帮我）
-    - 问题报告（出现XX问题）
-    - 请求确认（是不是/对吗）
-
-    **排除的内容:**
-    - 寒暄问候（你好/在吗/谢谢）
-    - 情绪表达（好的/嗯/知道了）
-    - 过渡话术（请稍等/正在查询）
-
-    ### 5.2 指代还原规则
-
-    | 指代词 | 处理方式 | 示例 |
-    |-------|---------|------|
-    | 这款/那款/它 | 替换为完整产品型号 | "它防水吗" → "Apple Watch Series 9防水吗" |
-    | 这个服务/那个 | 替换为具体服务名称 | "这个多久" → "7天无理由退货服务多久" |
-    | 我的订单 | 补充订单号 | "我的订单" → "订单202401120001" |
-    | 刚才说的 | 定位具体内容 | "刚才那个" → 还原为之前提及的对象 |
-
-    **无法还原 → 判定无效:**
-    - 对话未提及具体产品，仅有"这个"
-    - 涉及多个对象，无法判断指代哪个
-    - 关键信息缺失且无法推断
-
-    ### 5.3 内容标准化
-
-    **问题标准化:**
-    1. 消除所有指代词，替换为具体对象
-    2. 补全省略信息，形成完整问句
-    3. 保持原意不变
-
-    **答案标准化:**
-    1. 合并分散的多条回复
-    2. 去除冗余的客套话和过渡语
-    3. 保留关键信息（数字/时间/步骤）
-    4. 用分号或序号组织多要点
-
-    ### 5.4 意图分类
-
-    根据问题**核心关注点**选择一项:
-
-    | 意图类型 | 关键词 | 典型问题 |
-    |---------|-------|---------|
-    | 产品&功能咨询 | 功能/参数/支持/能否 | "支持NFC吗" |
-    | 产品&品类咨询 | 有哪些/型号/系列 | "有什么智能手表" |
-    | 尺寸&佩戴咨询 | 尺码/大小/佩戴 | "手腕16cm选多大" |
-    | 价格&优惠咨询 | 价格/折扣/活动 | "有优惠吗" |
-    | 物流&时效咨询 | 发货/配送/几天到 | "什么时候发货" |
-    | 售后&质保咨询 | 退换/维修/保修 | "支持退货吗" |
-    | 支付&订单咨询 | 支付/订单/发票 | "支持花呗吗" |
-    | 门店&渠道咨询 | 实体店/门店/哪里买 | "北京有门店吗" |
-    | 品牌&真伪咨询 | 正品/真假/授权 | "是正品吗" |
-    | 使用&配件咨询 | 怎么用/保养/配件 | "如何设置" |
-    | 送礼&定制咨询 | 送礼/刻字/定制 | "能刻字吗" |
-    | 管家&服务咨询 | 客服/服务/咨询 | "有专属客服吗" |
-    | 其他咨询 | 无法归入以上 | - |
-
-    ### 5.5 特殊情况处理
-
-    | 场景 | 处理方式 |
-    |------|---------|
-    | 多轮追问 | 合并为一个完整问答 |
-    | 一问多答 | 合并所有答案内容 |
-    | 多问打包 | 拆分为多个问答对 |
-    | 未得到答案 | 不提取 |
-    | 答非所问 | 不提取 |
-    | 指代无法还原 | 不提取 |
-
-    ---
-
-    ## 六、执行步骤
-
-    1. 通读对话，提取所有具体实体（产品/订单号/型号）
-    2. 识别有咨询意图的客户消息
-    3. 匹配对应的客服实质性回复
-    4. 还原问题中的所有指代词（无法还原则跳过）
-    5. 合并同一问题的追问和多条答案
-    6. 标准化问题和答案表达
-    7. 分类并输出JSON
-
-    ---
-
-    ## 七、典型示例
-
-    ### 示例1: 标准处理
-
-    **输入:**
-    1. 客户: DW Classic Petite 28mm石英表
-    2. 客户: 这款防水吗
-    3. 客服: 支持3ATM防水
-    4. 客服: 可以日常洗手佩戴
-
-    **输出:**
-    [
-    {
-        "question": "DW Classic Petite 28mm石英表防水吗?",
-        "answer": "支持3ATM防水,可以日常洗手佩戴。",
-        "intent": "产品&功能咨询"
-    }
-    ]
-
-    ### 示例2: 无法还原 → 不提取
-
-    **输入:**
-    1. 客户: 在吗
-    2. 客户: 这个多少钱
-
-    **输出:**
-    []
-    **原因:** "这个"无法从上下文还原具体产品
-
-    ### 示例3: 部分有效
-
-    **输入:**
-    1. 客户: Fossil Gen 6智能手表有货吗
-    2. 客服: 有货的,今天就能发货
-    3. 客户: 它防水吗
-    4. 客服: 支持5ATM防水
-    5. 客户: 那个呢
-
-    **输出:**
-    [
-    {
-        "question": "Fossil Gen 6智能手表有货吗?",
-        "answer": "有货的,今天就能发货。",
-        "intent": "产品&品类咨询"
-    },
-    {
-        "question": "Fossil Gen 6智能手表防水吗?",
-        "answer": "支持5ATM防水。",
-        "intent": "产品&功能咨询"
-    }
-    ]
-    **说明:** "它"可还原，"那个"无法确定指代对象
-
-    ---
-
-    ## 八、快速自检
-
-    提取前确认:
-    - [ ] 问题无指代词且可独立理解?
-    - [ ] 客服给出实质性答复?
-    - [ ] 问答内容匹配?
-    - [ ] 意图分类准确?
-
-    **任一不符合 → 不提取该问答对**
-
-    ---
-
-    ## 九、输出要求
-
-    **必须:**
-    输出有效JSON数组  
-    问题无指代词且可独立理解  
-    答案完整连贯有实质内容  
-    使用规定的意图分类枚举值  
-    无有效问答时输出 []
-    **禁止:**
-    问题中保留指代词  
-    提取无法还原指代的问答  
-    提取仅有过渡话术的回复  
-    提取答非所问的问答对
-
-    ---
-    """
-
-    user_prompt: str = """
-    对话内容: {context}
-    """
-
-    def __init__(self, openai_client: AsyncOpenAI, llm_model: str, temperature: float):
+        ## 五、提取规则
+
+        ### 5.1 有效性识别
+
+        **提取的问题:**
+        - 明确咨询意图（如何/能否/什么/有没有）
+        - 具体需求表达（我想要/需要帮我）
+        - 问题报告（出现XX问题）
+        - 请求确认（是不是/对吗）
+
+        **排除的内容:**
+        - 寒暄问候（你好/在吗/谢谢）
+        - 情绪表达（好的/嗯/知道了）
+        - 过渡话术（请稍等/正在查询）
+
+        ### 5.2 指代还原规则
+
+        | 指代词 | 处理方式 | 示例 |
+        |-------|---------|------|
+        | 这款/那款/它 | 替换为完整产品型号 | "它防水吗" → "Apple Watch Series 9防水吗" |
+        | 这个服务/那个 | 替换为具体服务名称 | "这个多久" → "7天无理由退货服务多久" |
+        | 我的订单 | 补充订单号 | "我的订单" → "订单202401120001" |
+        | 刚才说的 | 定位具体内容 | "刚才那个" → 还原为之前提及的对象 |
+
+        **无法还原 → 判定无效:**
+        - 对话未提及具体产品，仅有"这个"
+        - 涉及多个对象，无法判断指代哪个
+        - 关键信息缺失且无法推断
+
+        ### 5.3 内容标准化
+
+        **问题标准化:**
+        1. 消除所有指代词，替换为具体对象
+        2. 补全省略信息，形成完整问句
+        3. 保持原意不变
+
+        **答案标准化:**
+        1. 合并分散的多条回复
+        2. 去除冗余的客套话和过渡语
+        3. 保留关键信息（数字/时间/步骤）
+        4. 用分号或序号组织多要点
+
+        ### 5.4 意图分类
+
+        根据问题**核心关注点**选择一项:
+
+        | 意图类型 | 关键词 | 典型问题 |
+        |---------|-------|---------|
+        | 产品&功能咨询 | 功能/参数/支持/能否 | "支持NFC吗" |
+        | 产品&品类咨询 | 有哪些/型号/系列 | "有什么智能手表" |
+        | 尺寸&佩戴咨询 | 尺码/大小/佩戴 | "手腕16cm选多大" |
+        | 价格&优惠咨询 | 价格/折扣/活动 | "有优惠吗" |
+        | 物流&时效咨询 | 发货/配送/几天到 | "什么时候发货" |
+        | 售后&质保咨询 | 退换/维修/保修 | "支持退货吗" |
+        | 支付&订单咨询 | 支付/订单/发票 | "支持花呗吗" |
+        | 门店&渠道咨询 | 实体店/门店/哪里买 | "北京有门店吗" |
+        | 品牌&真伪咨询 | 正品/真假/授权 | "是正品吗" |
+        | 使用&配件咨询 | 怎么用/保养/配件 | "如何设置" |
+        | 送礼&定制咨询 | 送礼/刻字/定制 | "能刻字吗" |
+        | 管家&服务咨询 | 客服/服务/咨询 | "有专属客服吗" |
+        | 其他咨询 | 无法归入以上 | - |
+
+        ### 5.5 特殊情况处理
+
+        | 场景 | 处理方式 |
+        |------|---------|
+        | 多轮追问 | 合并为一个完整问答 |
+        | 一问多答 | 合并所有答案内容 |
+        | 多问打包 | 拆分为多个问答对 |
+        | 未得到答案 | 不提取 |
+        | 答非所问 | 不提取 |
+        | 指代无法还原 | 不提取 |
+
+        ---
+
+        ## 六、执行步骤
+
+        1. 通读对话，提取所有具体实体（产品/订单号/型号）
+        2. 识别有咨询意图的客户消息
+        3. 匹配对应的客服实质性回复
+        4. 还原问题中的所有指代词（无法还原则跳过）
+        5. 合并同一问题的追问和多条答案
+        6. 标准化问题和答案表达
+        7. 分类并输出JSON
+
+        ---
+
+        ## 七、典型示例
+
+        ### 示例1: 标准处理
+
+        **输入:**
+        1. 客户: DW Classic Petite 28mm石英表
+        2. 客户: 这款防水吗
+        3. 客服: 支持3ATM防水
+        4. 客服: 可以日常洗手佩戴
+
+        **输出:**
+        [
+        {
+            "question": "DW Classic Petite 28mm石英表防水吗?",
+            "answer": "支持3ATM防水,可以日常洗手佩戴。",
+            "intent": "产品&功能咨询"
+        }
+        ]
+
+        ### 示例2: 无法还原 → 不提取
+
+        **输入:**
+        1. 客户: 在吗
+        2. 客户: 这个多少钱
+
+        **输出:**
+        []
+        **原因:** "这个"无法从上下文还原具体产品
+
+        ### 示例3: 部分有效
+
+        **输入:**
+        1. 客户: Fossil Gen 6智能手表有货吗
+        2. 客服: 有货的,今天就能发货
+        3. 客户: 它防水吗
+        4. 客服: 支持5ATM防水
+        5. 客户: 那个呢
+
+        **输出:**
+        [
+        {
+            "question": "Fossil Gen 6智能手表有货吗?",
+            "answer": "有货的,今天就能发货。",
+            "intent": "产品&品类咨询"
+        },
+        {
+            "question": "Fossil Gen 6智能手表防水吗?",
+            "answer": "支持5ATM防水。",
+            "intent": "产品&功能咨询"
+        }
+        ]
+        **说明:** "它"可还原，"那个"无法确定指代对象
+
+        ---
+
+        ## 八、快速自检
+
+        提取前确认:
+        - [ ] 问题无指代词且可独立理解?
+        - [ ] 客服给出实质性答复?
+        - [ ] 问答内容匹配?
+        - [ ] 意图分类准确?
+
+        **任一不符合 → 不提取该问答对**
+
+        ---
+
+        ## 九、输出要求
+
+        **必须:**
+        输出有效JSON数组  
+        问题无指代词且可独立理解  
+        答案完整连贯有实质内容  
+        使用规定的意图分类枚举值  
+        无有效问答时输出 []
+        **禁止:**
+        问题中保留指代词  
+        提取无法还原指代的问答  
+        提取仅有过渡话术的回复  
+        提取答非所问的问答对
+
+        ---
+        """
+    ).strip()
+
+    user_prompt: str = textwrap.dedent(
+        """
+        对话内容: {context}
+        """
+    ).strip()
+
+    def __init__(
+        self,
+        openai_client: AsyncOpenAI,
+        llm_model: str,
+        temperature: float,
+        cache_capacity: int = 4096,
+        semantic_cache: SemanticCache | None = None,
+        max_context_length: int = 32 * 1024,
+        max_context_tokens: int = 0,
+    ):
         """初始化LLM QA对生成器"""
         self.client = openai_client
         self.llm_model = llm_model
         self.temperature = temperature
+        self.max_context_length = max_context_length
+        self.max_context_tokens = max_context_tokens
+        self.semantic_cache = semantic_cache
+        self._cache = LRUCache(cache_capacity)
+        self._system_message = {"role": "system", "content": self.system_prompt}
+        if max_context_tokens > 0 and tiktoken is None:
+            logger.warning(
+                "%s max_context_tokens=%d is ignored because tiktoken is not "
+                "installed, contexts are truncated by max_context_length only",
+                self.__class__.__name__,
+                max_context_tokens,
+            )
 
-    async def generate(self, context: str) -> list[dict]:
-        """生成QA对"""
-        response = await self.client.chat.completions.create(
-            model=self.llm_model,
-            messages=[
-                {"role": "system", "content": self.system_prompt},
-                {"role": "user", "content": self.user_prompt.format(context=context)},
+    @property
+    def _truncate_by_tokens(self) -> bool:
+        """是否按 token 数截断"""
+        return tiktoken is not None and self.max_context_tokens > 0
+
+    @cached_property
+    def _encoding(self) -> "tiktoken.Encoding | None":
+        """按 token 截断使用的编码，首次使用时加载，可能需要下载 BPE 文件"""
+        if not self._truncate_by_tokens:
+            return None
+        try:
+            return tiktoken.encoding_for_model(self.llm_model)
+        except KeyError:
+            # 非 OpenAI 模型没有对应编码，使用通用编码近似
+            return tiktoken.get_encoding("cl100k_base")
+
+    def truncate(self, context: str) -> str:
+        """截断上下文，先按字符数截断，配置 token 上限且安装 tiktoken 时再按 token 数截断"""
+        if len(context) > self.max_context_length:
+            context = context[: self.max_context_length]
+        if self._encoding is not None:
+            tokens = self._encoding.encode(context)
+            if len(tokens) > self.max_context_tokens:
+                context = self._encoding.decode(tokens[: self.max_context_tokens])
+        return context
+
+    def _render(self, context: str) -> tuple[str, bytes]:
+        """渲染用户提示词，返回提示词与缓存键"""
+        user_content = self.user_prompt.format_map({"context": self.truncate(context)})
+        return user_content, hashlib.blake2b(
+            user_content.encode(), digest_size=16
+        ).digest()
+
+    async def _render_many(self, contexts: list[str]) -> list[tuple[str, bytes]]:
+        """渲染一组上下文
+
+        按 token 截断时首次加载编码可能下载 BPE 文件，且编码为 CPU 密集操作，
+        放到线程中执行，避免阻塞事件循环
+        """
+        if self._truncate_by_tokens:
+            return await asyncio.to_thread(
+                lambda: [self._render(context) for context in contexts]
+            )
+        return [self._render(context) for context in contexts]
+
+    def _request_body(self, user_content: str) -> dict:
+        """构造 chat.completions 请求体，实时调用与批量调用共用"""
+        return {
+            "model": self.llm_model,
+            "messages": [
+                self._system_message,
+                {"role": "user", "content": user_content},
             ],
-            temperature=self.temperature,
-            max_tokens=1024,
-        )
-        content = response.choices[0].message.content.strip()
-        logger.debug(f"{self.__class__.__name__} response content: {content}")
+            "temperature": self.temperature,
+            "max_tokens": 1024,
+        }
+
+    def _parse(self, content: str) -> list[dict]:
+        """解析模型输出，解析失败时返回空列表"""
+        content = content.strip()
+        logger.debug("%s response content: %s", self.__class__.__name__, content)
 
         try:
-            generator_result = json.loads(content)
-        except json.JSONDecodeError:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
             logger.error(
-                f"{self.__class__.__name__} response content is not a valid JSON: {content}"
+                "%s response content is not a valid JSON: %s",
+                self.__class__.__name__,
+                content,
             )
             return []
 
-        return generator_result
+    async def generate(self, context: str) -> list[dict]:
+        """生成QA对"""
+        return [qa_pair async for qa_pair in self.generate_stream(context)]
+
+    async def generate_stream(self, context: str) -> AsyncIterator[dict]:
+        """流式生成QA对
+
+        先查精确匹配缓存，再查语义缓存，均未命中时流式调用模型，
+        数组中每个QA对闭合即解析产出，调用方无需等待完整回复即可开始过滤；
+        输出因 max_tokens 被截断时仍保留已闭合的QA对，未扫描到任何QA对时整体解析兜底。
+        调用方会修改返回的QA对，缓存命中时返回副本
+        """
+        ((user_content, cache_key),) = await self._render_many([context])
+        qa_pairs = self._cache.get(cache_key)
+        if qa_pairs is not None:
+            for qa_pair in qa_pairs:
+                yield dict(qa_pair)
+            return
+
+        embedding = None
+        if self.semantic_cache is not None:
+            embedding = await self.semantic_cache.embed(user_content)
+            qa_pairs = self.semantic_cache.get(embedding)
+            if qa_pairs is not None:
+                for qa_pair in qa_pairs:
+                    yield dict(qa_pair)
+                return
+
+        stream = await self.client.chat.completions.create(
+            **self._request_body(user_content), stream=True
+        )
+        scanner = JSONArrayScanner()
+        qa_pairs = []
+        try:
+            async for chunk in stream:
+                if not chunk.choices or not (delta := chunk.choices[0].delta.content):
+                    continue
+                for element in scanner.feed(delta):
+                    try:
+                        qa_pair = orjson.loads(element)
+                    except orjson.JSONDecodeError:
+                        logger.error(
+                            "%s response element is not a valid JSON: %s",
+                            self.__class__.__name__,
+                            element,
+                        )
+                        continue
+                    qa_pairs.append(dict(qa_pair))
+                    yield qa_pair
+        finally:
+            await stream.close()
+        if qa_pairs:
+            logger.debug(
+                "%s response content: %s",
+                self.__class__.__name__,
+                scanner.text.strip(),
+            )
+        else:
+            # 未扫描到对象数组时整体解析兜底，解析失败会记录原始输出
+            for qa_pair in self._parse(scanner.text):
+                if isinstance(qa_pair, dict):
+                    qa_pairs.append(dict(qa_pair))
+                    yield qa_pair
+
+        # 调用方提前结束或取消时不会执行到此处，不完整的结果不入缓存
+        if qa_pairs:
+            self._cache.set(cache_key, qa_pairs)
+            if embedding is not None:
+                self.semantic_cache.set(embedding, qa_pairs)
+
+    async def generate_batch(
+        self, contexts: list[str], batch_client: BatchLLMClient
+    ) -> list[list[dict] | None]:
+        """通过 Batch API 批量生成QA对
+
+        只查精确匹配缓存，未命中的上下文合并为一个批任务；
+        批任务未返回结果的位置为 None，由调用方回退为实时调用。
+        """
+        results: list[list[dict] | None] = [None] * len(contexts)
+        pending: list[tuple[int, bytes, str]] = []
+        rendered = await self._render_many(contexts)
+        for index, (user_content, cache_key) in enumerate(rendered):
+            qa_pairs = self._cache.get(cache_key)
+            if qa_pairs is not None:
+                results[index] = [dict(qa_pair) for qa_pair in qa_pairs]
+            else:
+                pending.append((index, cache_key, user_content))
+
+        contents = await batch_client.complete(
+            [self._request_body(user_content) for _, _, user_content in pending]
+        )
+        for (index, cache_key, _), content in zip(pending, contents):
+            if content is None:
+                continue
+            generator_result = self._parse(content)
+            if generator_result:
+                self._cache.set(
+                    cache_key, [dict(qa_pair) for qa_pair in generator_result]
+                )
+            results[index] = generator_result
+        return results
@@ -2,6 +2,7 @@ import logging
 
 from app.core.managers import async_job_manager
 from app.core.enum import JobStatus
+from app.core.workers import map_with_workers
 from .service import QAGenerationService
 from .utils import build_contexts
 from .models import ChatSession
@@ -18,22 +19,32 @@ async def generate_qa(
     """QA 生成任务"""
     try:
         contexts = build_contexts(chat_sessions)
-        filtered_qas = []
-        generated_count = 0
         progress = 0
 
-        for idx, context in enumerate(contexts):
-            qa_pairs = await service._generate(context)
-            generated_count += len(qa_pairs)
-            for qa_pair in qa_pairs:
-                if await service._filter(qa_pair):
-                    filtered_qas.append(qa_pair)
-
-            _progress = int((idx + 1) / len(contexts) * 100)
+        async def update_progress(done: int) -> None:
+            nonlocal progress
+            _progress = int(done / len(contexts) * 100)
             if _progress > progress:
                 progress = _progress
                 await async_job_manager.update_async_job(job_id, progress=progress)
 
+        if service.use_batch(len(contexts)):
+            # 离线大批量任务走 Batch API，批任务完成前不更新进度
+            generated_count, filtered_qas = await service._generate_and_filter_batch(
+                contexts
+            )
+        else:
+            results = await map_with_workers(
+                service._process_context,
+                contexts,
+                service.max_concurrency,
+                update_progress,
+            )
+            generated_count = sum(count for count, _ in results)
+            filtered_qas = [
+                qa_pair for _, qa_pairs in results for qa_pair in qa_pairs
+            ]
+
         post_processed_qas = await service._post_process(filtered_qas)
 
         for qa_pair in post_processed_qas:
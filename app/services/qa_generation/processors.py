@@ -1,12 +1,52 @@
+import asyncio
 import logging
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
 
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
+try:
+    from numba import njit
+except ImportError:  # numba 为可选依赖，未安装时使用 NumPy 实现
+    njit = None
+
 logger = logging.getLogger(__name__)
 
 
+def _greedy_duplicates_numpy(
+    similarities: np.ndarray, threshold: float, duplicated: np.ndarray
+) -> np.ndarray:
+    """逐行向量化比较，每个保留行一次 NumPy 调用"""
+    for i in range(len(similarities)):
+        if duplicated[i]:
+            continue
+        duplicated[i + 1 :] |= similarities[i, i + 1 :] > threshold
+    return duplicated
+
+
+def _greedy_duplicates_scalar(
+    similarities: np.ndarray, threshold: float, duplicated: np.ndarray
+) -> np.ndarray:
+    """标量双重循环，供 numba 编译为机器码，无逐行 NumPy 调用开销"""
+    n = similarities.shape[0]
+    for i in range(n):
+        if duplicated[i]:
+            continue
+        for j in range(i + 1, n):
+            if similarities[i, j] > threshold:
+                duplicated[j] = True
+    return duplicated
+
+
+# 贪心去重依赖前序结果，只能顺序执行，不使用 parallel
+_greedy_duplicates = (
+    njit(cache=True)(_greedy_duplicates_scalar)
+    if njit is not None
+    else _greedy_duplicates_numpy
+)
+
+
 class Processor(ABC):
     """处理器抽象基类"""
 
@@ -20,48 +60,73 @@ class SemanticProcessor(Processor):
     """语义处理器"""
 
     def __init__(
-        self, sentence_transformer: SentenceTransformer, semantic_threshold: float
+        self,
+        sentence_transformer: SentenceTransformer,
+        semantic_threshold: float,
+        batch_size: int = 64,
     ):
         self.sentence_transformer = sentence_transformer
         self.semantic_threshold = semantic_threshold
+        self.batch_size = batch_size
+
+    def _encode(self, qas: list[dict]) -> np.ndarray:
+        """对问题进行编码，归一化后内积即余弦相似度"""
+        return self.sentence_transformer.encode(
+            [qa["question"] for qa in qas],
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+
+    def _mark_duplicates(
+        self, embeddings: np.ndarray, duplicated: np.ndarray
+    ) -> np.ndarray:
+        """按顺序贪心去重：保留的问答对将其后相似度大于阈值的问答对标记为重复"""
+        # 一次矩阵乘法得到两两相似度
+        similarities = np.ascontiguousarray(embeddings @ embeddings.T)
+        return _greedy_duplicates(similarities, self.semantic_threshold, duplicated)
 
     async def process(self, qas: list[dict]) -> list[dict]:
         """处理QA对，移除相似度大于阈值的重复问答对"""
         if not qas:
             return qas
 
-        # 提取所有问题
-        questions = [qa["question"] for qa in qas]
-
-        # 对问题进行编码
-        embeddings = self.sentence_transformer.encode(questions, convert_to_numpy=True)
-
-        # 用于存储需要保留的索引
-        keep_indices = []
-
-        removed_qas = []
-
-        # 遍历每个问答对
-        for i in range(len(qas)):
-            should_keep = True
-
-            # 与之前保留的问答对比较相似度
-            for j in keep_indices:
-                # 计算余弦相似度
-                similarity = np.dot(embeddings[i], embeddings[j]) / (
-                    np.linalg.norm(embeddings[i]) * np.linalg.norm(embeddings[j])
-                )
-
-                # 如果相似度大于阈值，则跳过当前问答对
-                if similarity > self.semantic_threshold:
-                    should_keep = False
-                    removed_qas.append(qas[i])
-                    break
-
-            # 如果应该保留，添加到保留列表
-            if should_keep:
-                keep_indices.append(i)
+        # 编码为 CPU 密集的阻塞操作，放到线程中执行
+        embeddings = await asyncio.to_thread(self._encode, qas)
+        duplicated = self._mark_duplicates(
+            embeddings, np.zeros(len(qas), dtype=bool)
+        )
 
-        logger.debug(f"{self.__class__.__name__} removed qas: {removed_qas}")
+        removed_qas = [
+            qa for qa, is_duplicated in zip(qas, duplicated) if is_duplicated
+        ]
+        logger.debug("%s removed qas: %s", self.__class__.__name__, removed_qas)
         # 返回保留的问答对
-        return [qas[i] for i in keep_indices]
+        return [qa for qa, is_duplicated in zip(qas, duplicated) if not is_duplicated]
+
+    async def process_stream(
+        self, batches: AsyncIterator[list[dict]]
+    ) -> AsyncIterator[dict]:
+        """增量处理QA对，每批只与已保留的问答对及本批之前的问答对比较，逐条产出保留结果"""
+        kept_embeddings: np.ndarray | None = None
+        async for qas in batches:
+            if not qas:
+                continue
+
+            # 编码为 CPU 密集的阻塞操作，放到线程中执行，避免阻塞其他流与请求
+            embeddings = await asyncio.to_thread(self._encode, qas)
+            duplicated = np.zeros(len(qas), dtype=bool)
+            if kept_embeddings is not None:
+                duplicated |= (
+                    embeddings @ kept_embeddings.T > self.semantic_threshold
+                ).any(axis=1)
+            duplicated = self._mark_duplicates(embeddings, duplicated)
+
+            kept = embeddings[~duplicated]
+            kept_embeddings = (
+                kept if kept_embeddings is None else np.vstack((kept_embeddings, kept))
+            )
+            for qa, is_duplicated in zip(qas, duplicated):
+                if not is_duplicated:
+                    yield qa
@@ -1,15 +1,18 @@
-import orjson
+import asyncio
+from collections.abc import AsyncIterator
 from datetime import datetime
 
+import orjson
 from fastapi import APIRouter, Depends, UploadFile, Query, Request
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 
 from app.core.managers import async_job_manager
 from app.core.enum import JobType
+from app.core.responses import success_file_response, success_response
 from .jobs import generate_qa
 from .service import QAGenerationService
 from .deps import get_qa_generation_service
-from .models import ChatSession, QAGenerationRequestAdapter
+from .models import ChatSession, QAGenerationRequest, QAGenerationRequestAdapter
 from .utils import build_contexts
 
 router = APIRouter(
@@ -17,6 +20,17 @@ router = APIRouter(
     tags=["QA Generation"],
 )
 
+# 不小于该大小的上传文件在线程中解析校验，避免大文件阻塞事件循环
+THREAD_PARSE_MIN_BYTES = 1024 * 1024
+
+
+async def _parse_file(file: UploadFile) -> QAGenerationRequest:
+    """读取并校验上传文件"""
+    data = await file.read()
+    if len(data) < THREAD_PARSE_MIN_BYTES:
+        return QAGenerationRequestAdapter.validate_json(data)
+    return await asyncio.to_thread(QAGenerationRequestAdapter.validate_json, data)
+
 
 async def _generate_qa(
     chat_sessions: list[ChatSession], metadata: dict, qa_generation_service: QAGenerationService
@@ -30,6 +44,20 @@ async def _generate_qa(
     return qas_result
 
 
+def _generate_qa_stream(
+    chat_sessions: list[ChatSession], metadata: dict, qa_generation_service: QAGenerationService
+) -> StreamingResponse:
+    """流式生成QA，每行一个 JSON 对象"""
+    contexts = build_contexts(chat_sessions)
+
+    async def lines() -> AsyncIterator[bytes]:
+        async for qa_pair in qa_generation_service.generate_qa_stream(contexts):
+            qa_pair["metadata"] = metadata
+            yield orjson.dumps(qa_pair) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.post("/sync/generate_from_body")
 async def generate_qa_from_body(
     request: Request,
@@ -86,23 +114,11 @@ async def generate_qa_from_body(
         }
 
     qas_result = await _generate_qa(chat_sessions, metadata, qa_generation_service)
-    content = orjson.dumps(
-        {
-            "code": 200,
-            "message": "success",
-            "data": qas_result,
-        }
-    )
-
     if return_file:
         filename = f"qa_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
-        return Response(
-            content=content,
-            media_type="application/octet-stream",
-            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-        )
+        return success_file_response(qas_result, filename)
     else:
-        return Response(content=content, media_type="application/json")
+        return success_response(qas_result)
 
 
 @router.post("/sync/generate_from_file")
@@ -151,7 +167,7 @@ async def generate_qa_from_file(
         }
     ```
     """
-    body = QAGenerationRequestAdapter.validate_json(await file.read())
+    body = await _parse_file(file)
     chat_sessions = body["data"]
     metadata = body.get("metadata")
     if not metadata:
@@ -161,30 +177,114 @@ async def generate_qa_from_file(
         }
 
     qas_result = await _generate_qa(chat_sessions, metadata, qa_generation_service)
-    content = orjson.dumps(
-        {
-            "code": 200,
-            "message": "success",
-            "data": qas_result,
-        }
-    )
-
     if return_file:
         filename = f"qa_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
-        return Response(
-            content=content,
-            media_type="application/octet-stream",
-            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-        )
+        return success_file_response(qas_result, filename)
     else:
-        return Response(content=content, media_type="application/json")
+        return success_response(qas_result)
+
+
+@router.post("/stream/generate_from_body")
+async def generate_qa_from_body_stream(
+    request: Request,
+    qa_generation_service: QAGenerationService = Depends(get_qa_generation_service),
+) -> StreamingResponse:
+    """从请求体中的会话数据流式生成 QA，每生成一条即以 NDJSON 返回。
+
+    结果按上下文完成顺序返回，语义去重逐条增量进行。
+
+    ```
+    Args:
+        request: FastAPI 请求对象。
+
+    Request body (JSON schema):
+        {
+            "data": [
+                {
+                    "messages": [
+                        {
+                            "role": "string",
+                            "content": "string",
+                            "datetime": "string (optional)"
+                        }
+                    ]
+                }
+            ],
+            "metadata": {}  // optional, arbitrary key-value
+        }
+
+    Returns:
+        StreamingResponse: application/x-ndjson 响应。
+
+    Response body (NDJSON, 每行一个对象):
+        {"question": "...", "answer": "...", "intent": "...", "metadata": {}}
+    ```
+    """
+    body = QAGenerationRequestAdapter.validate_json(await request.body())
+    chat_sessions = body["data"]
+    metadata = body.get("metadata")
+    if not metadata:
+        metadata = {
+            "source": "http request",
+            "datetime": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+    return _generate_qa_stream(chat_sessions, metadata, qa_generation_service)
+
+
+@router.post("/stream/generate_from_file")
+async def generate_qa_from_file_stream(
+    file: UploadFile,
+    qa_generation_service: QAGenerationService = Depends(get_qa_generation_service),
+) -> StreamingResponse:
+    """从上传的 JSON 文件中的会话数据流式生成 QA，每生成一条即以 NDJSON 返回。
+
+    结果按上下文完成顺序返回，语义去重逐条增量进行。
+
+    ```
+    Args:
+        file: 上传的 JSON 文件。
+
+    Request body (file content, JSON schema):
+        {
+            "data": [
+                {
+                    "messages": [
+                        {
+                            "role": "string",
+                            "content": "string",
+                            "datetime": "string (optional)"
+                        }
+                    ]
+                }
+            ],
+            "metadata": {}  // optional, arbitrary key-value
+        }
+
+    Returns:
+        StreamingResponse: application/x-ndjson 响应。
+
+    Response body (NDJSON, 每行一个对象):
+        {"question": "...", "answer": "...", "intent": "...", "metadata": {}}
+    ```
+    """
+    body = await _parse_file(file)
+    chat_sessions = body["data"]
+    metadata = body.get("metadata")
+    if not metadata:
+        metadata = {
+            "source": file.filename,
+            "datetime": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+    return _generate_qa_stream(chat_sessions, metadata, qa_generation_service)
 
 
 @router.post("/async/generate_from_body")
 async def generate_qa_from_body_async(
     request: Request,
     qa_generation_service: QAGenerationService = Depends(get_qa_generation_service),
-) -> dict:
+) -> Response:
     """从请求体中的会话数据异步生成 QA，返回任务 ID。
 
     ```
@@ -208,7 +308,7 @@ async def generate_qa_from_body_async(
         }
 
     Returns:
-        dict: 响应体。
+        Response: 响应体。
 
     Response body (JSON schema):
         {"code": 200, "message": "success", "data": {"job_id": "string"}}
@@ -227,18 +327,14 @@ async def generate_qa_from_body_async(
         JobType.QA_GENERATION, generate_qa, chat_sessions, metadata, qa_generation_service
     )
 
-    return {
-        "code": 200,
-        "message": "success",
-        "data": {"job_id": job_id},
-    }
+    return success_response({"job_id": job_id})
 
 
 @router.post("/async/generate_from_file")
 async def generate_qa_from_file_async(
     file: UploadFile,
     qa_generation_service: QAGenerationService = Depends(get_qa_generation_service),
-) -> dict:
+) -> Response:
     """从上传的 JSON 文件中的会话数据异步生成 QA，返回任务 ID。
 
     ```
@@ -262,13 +358,13 @@ async def generate_qa_from_file_async(
         }
 
     Returns:
-        dict: 响应体。
+        Response: 响应体。
 
     Response body (JSON schema):
         {"code": 200, "message": "success", "data": {"job_id": "string"}}
     ```
     """
-    body = QAGenerationRequestAdapter.validate_json(await file.read())
+    body = await _parse_file(file)
     chat_sessions = body["data"]
     metadata = body.get("metadata")
     if not metadata:
@@ -281,8 +377,4 @@ async def generate_qa_from_file_async(
         JobType.QA_GENERATION, generate_qa, chat_sessions, metadata, qa_generation_service
     )
 
-    return {
-        "code": 200,
-        "message": "success",
-        "data": {"job_id": job_id},
-    }
+    return success_response({"job_id": job_id})
@@ -1,10 +1,18 @@
+import asyncio
 import logging
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any
 
+import numpy as np
 from sentence_transformers import SentenceTransformer
 from openai import AsyncOpenAI
 
+from app.core.batches import BatchLLMClient
+from app.core.caches import SemanticCache
+from app.core.workers import map_with_workers
+
 from .generators import LLMQAGenerator
-from .filters import RuleFilter, LLMFilter
+from .filters import RULE_CONDITION_FIELDS, RuleFilter, LLMFilter, DistilledFilter
 from .processors import SemanticProcessor
 
 logger = logging.getLogger(__name__)
@@ -22,18 +30,90 @@ class QAGenerationService:
         filter_temperature: float,
         semantic_threshold: float,
         filter_rules: list[dict],
+        semantic_batch_size: int = 64,
+        max_concurrency: int = 8,
+        cache_capacity: int = 4096,
+        semantic_cache_enabled: bool = False,
+        semantic_cache_threshold: float = 0.95,
+        semantic_cache_ttl: float = 3600,
+        semantic_cache_capacity: int = 4096,
+        batch_enabled: bool = False,
+        batch_threshold: int = 100,
+        batch_poll_interval: float = 30,
+        max_context_length: int = 32 * 1024,
+        max_context_tokens: int = 0,
+        distilled_filter_path: str = "",
+        distilled_filter_confidence: float = 0.9,
     ):
-        """初始化问题生成服务"""
-        self.generator_pipeline = [
-            LLMQAGenerator(openai_client, llm_model, generator_temperature),
-        ]
-        self.filter_pipeline = [
+        """初始化问题生成服务
+
+        启用语义缓存时为生成器与过滤器分别创建缓存；
+        启用 Batch API 时创建批量客户端，供异步任务处理大批量上下文；
+        配置蒸馏过滤器权重时由分类器先行判定，只有不确定的QA对才调用LLM过滤
+        """
+
+        def semantic_cache() -> SemanticCache | None:
+            if not semantic_cache_enabled:
+                return None
+            return SemanticCache(
+                sentence_transformer,
+                semantic_cache_threshold,
+                semantic_cache_ttl,
+                semantic_cache_capacity,
+            )
+
+        generator = LLMQAGenerator(
+            openai_client,
+            llm_model,
+            generator_temperature,
+            cache_capacity,
+            semantic_cache(),
+            max_context_length,
+            max_context_tokens,
+        )
+        self.generator_pipeline = [generator]
+        self._generate_stream = generator.generate_stream
+        # 规则过滤开销低，先同步预筛，只有通过的QA对才进入 LLM 过滤
+        self.rule_filter_pipeline = [
             RuleFilter(filter_rules),
-            LLMFilter(openai_client, llm_model, filter_temperature),
-        ]
-        self.post_process_pipeline = [
-            SemanticProcessor(sentence_transformer, semantic_threshold),
         ]
+        llm_filter = LLMFilter(
+            openai_client,
+            llm_model,
+            filter_temperature,
+            cache_capacity,
+            semantic_cache(),
+        )
+        distilled_filter = (
+            DistilledFilter(
+                sentence_transformer,
+                distilled_filter_path,
+                llm_filter,
+                distilled_filter_confidence,
+            )
+            if distilled_filter_path
+            else None
+        )
+        self.filter_pipeline = [distilled_filter or llm_filter]
+        self._llm_filter = llm_filter.filter
+        self._predict_batch = distilled_filter.predict_batch if distilled_filter else None
+        semantic_processor = SemanticProcessor(
+            sentence_transformer, semantic_threshold, semantic_batch_size
+        )
+        self.post_process_pipeline = [semantic_processor]
+        self._post_process_stream = semantic_processor.process_stream
+        # 服务为应用级单例，信号量限制所有请求生成与过滤的模型调用总并发，避免触发模型限流
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+
+        self._generate_batch = generator.generate_batch
+        self._filter_batch = llm_filter.filter_batch
+        self.batch_client = (
+            BatchLLMClient(openai_client, batch_poll_interval)
+            if batch_enabled
+            else None
+        )
+        self.batch_threshold = batch_threshold
 
     async def _generate(self, context: str) -> list[dict]:
         """生成QA对"""
@@ -43,6 +123,23 @@ class QAGenerationService:
                 return qa_pairs
         return []
 
+    def _rule_filter(self, qa_pair: dict) -> bool:
+        """规则预筛QA对"""
+        return all(filter.filter(qa_pair) for filter in self.rule_filter_pipeline)
+
+    def _rule_filter_batch(self, qa_pairs: list[dict]) -> list[dict]:
+        """批量规则预筛，QA对按字段转为列后逐列匹配，返回通过的QA对"""
+        if not qa_pairs:
+            return []
+        columns = {
+            field: [qa_pair.get(field, "") for qa_pair in qa_pairs]
+            for _, field in RULE_CONDITION_FIELDS
+        }
+        keeps = np.ones(len(qa_pairs), dtype=bool)
+        for filter in self.rule_filter_pipeline:
+            keeps &= filter.filter_batch(columns)
+        return [qa_pair for qa_pair, keep in zip(qa_pairs, keeps.tolist()) if keep]
+
     async def _filter(self, qa_pair: dict) -> bool:
         """过滤QA对"""
         for filter in self.filter_pipeline:
@@ -50,6 +147,113 @@ class QAGenerationService:
                 return False
         return True
 
+    async def _generate_limited(self, context: str) -> list[dict]:
+        """在并发限制内生成QA对"""
+        async with self._semaphore:
+            return await self._generate(context)
+
+    async def _filter_limited(self, qa_pair: dict) -> bool:
+        """在并发限制内过滤QA对"""
+        async with self._semaphore:
+            return await self._filter(qa_pair)
+
+    async def _llm_filter_limited(self, qa_pair: dict) -> bool:
+        """在并发限制内以LLM过滤QA对"""
+        async with self._semaphore:
+            return await self._llm_filter(qa_pair)
+
+    async def _filter_many(self, qa_pairs: list[dict]) -> list[bool]:
+        """并发过滤一组QA对
+
+        配置蒸馏过滤器时先一次性编码全部QA对判定，只有不确定的QA对再调用LLM过滤
+        """
+        if self._predict_batch is None:
+            return await map_with_workers(
+                self._filter_limited, qa_pairs, self.max_concurrency
+            )
+
+        keeps = await self._predict_batch(qa_pairs)
+        uncertain = [index for index, keep in enumerate(keeps) if keep is None]
+        results = await map_with_workers(
+            lambda index: self._llm_filter_limited(qa_pairs[index]),
+            uncertain,
+            self.max_concurrency,
+        )
+        for index, keep in zip(uncertain, results):
+            keeps[index] = keep
+        return keeps
+
+    async def _process_context(self, context: str) -> tuple[int, list[dict]]:
+        """生成单个上下文的QA对，返回生成数量与过滤后的QA对
+
+        流式生成，每个QA对解析完成即规则预筛并提交过滤，过滤与剩余生成并行
+        """
+        generated_count = 0
+        candidates: list[tuple[dict, asyncio.Task]] = []
+        try:
+            async with self._semaphore:
+                async for qa_pair in self._generate_stream(context):
+                    generated_count += 1
+                    if self._rule_filter(qa_pair):
+                        candidates.append(
+                            (
+                                qa_pair,
+                                asyncio.create_task(self._filter_limited(qa_pair)),
+                            )
+                        )
+            keeps = await asyncio.gather(*(task for _, task in candidates))
+        except BaseException:
+            for _, task in candidates:
+                task.cancel()
+            raise
+        return generated_count, [
+            qa_pair for (qa_pair, _), keep in zip(candidates, keeps) if keep
+        ]
+
+    def use_batch(self, context_count: int) -> bool:
+        """上下文数达到阈值且启用 Batch API 时走批量路径"""
+        return self.batch_client is not None and context_count >= self.batch_threshold
+
+    async def _complete_missing(
+        self,
+        results: list[Any],
+        items: list[Any],
+        func: Callable[[Any], Awaitable[Any]],
+    ) -> list[Any]:
+        """批任务未返回结果的条目回退为实时调用"""
+        missing = [index for index, result in enumerate(results) if result is None]
+        if missing:
+            logger.warning(
+                "%s batch missing %d results, falling back to real-time calls",
+                self.__class__.__name__,
+                len(missing),
+            )
+            fallback = await map_with_workers(
+                lambda index: func(items[index]), missing, self.max_concurrency
+            )
+            for index, result in zip(missing, fallback):
+                results[index] = result
+        return results
+
+    async def _generate_and_filter_batch(
+        self, contexts: list[str]
+    ) -> tuple[int, list[dict]]:
+        """通过 Batch API 生成并过滤QA对，返回生成数量与过滤后的QA对"""
+        results = await self._generate_batch(contexts, self.batch_client)
+        results = await self._complete_missing(
+            results, contexts, self._generate_limited
+        )
+        generated_qas = [qa_pair for qa_pairs in results for qa_pair in qa_pairs]
+
+        candidate_qas = self._rule_filter_batch(generated_qas)
+        keeps = await self._filter_batch(candidate_qas, self.batch_client)
+        keeps = await self._complete_missing(
+            keeps, candidate_qas, self._filter_limited
+        )
+        return len(generated_qas), [
+            qa_pair for qa_pair, keep in zip(candidate_qas, keeps) if keep
+        ]
+
     async def _post_process(self, qas: list[dict]) -> list[dict]:
         """后处理QA对"""
         for processor in self.post_process_pipeline:
@@ -58,24 +262,30 @@ class QAGenerationService:
 
     async def generate_qa(self, contexts: list[str]) -> list[dict]:
         """生成并处理QA对"""
-        generated_qas = []
-
-        # 生成候选QA对
-        for context in contexts:
-            qa_pairs = await self._generate(context)
-            generated_qas.extend(qa_pairs)
-        logger.info(f"{self.__class__.__name__} generated qas: {len(generated_qas)}")
+        # 并发生成候选QA对，结果顺序与上下文顺序一致
+        generated_qas = [
+            qa_pair
+            for qa_pairs in await map_with_workers(
+                self._generate_limited, contexts, self.max_concurrency
+            )
+            for qa_pair in qa_pairs
+        ]
+        logger.info("%s generated qas: %d", self.__class__.__name__, len(generated_qas))
 
-        # 过滤候选QA对
+        # 规则预筛后并发过滤候选QA对
+        candidate_qas = self._rule_filter_batch(generated_qas)
+        keeps = await self._filter_many(candidate_qas)
         filtered_qas = [
-            qa_pair for qa_pair in generated_qas if await self._filter(qa_pair)
+            qa_pair for qa_pair, keep in zip(candidate_qas, keeps) if keep
         ]
-        logger.info(f"{self.__class__.__name__} filtered qas: {len(filtered_qas)}")
+        logger.info("%s filtered qas: %d", self.__class__.__name__, len(filtered_qas))
 
         # 后处理候选QA对
         post_processed_qas = await self._post_process(filtered_qas)
         logger.info(
-            f"{self.__class__.__name__} post processed qas: {len(post_processed_qas)}"
+            "%s post processed qas: %d",
+            self.__class__.__name__,
+            len(post_processed_qas),
         )
 
         return {
@@ -85,3 +295,27 @@ class QAGenerationService:
             "total": len(post_processed_qas),
             "qas": post_processed_qas,
         }
+
+    async def generate_qa_stream(self, contexts: list[str]) -> AsyncIterator[dict]:
+        """流式生成QA对
+
+        各上下文并发处理，按完成顺序逐个增量去重并产出保留的QA对，
+        模型调用总并发由信号量限制；调用方提前结束时取消未完成的上下文
+        """
+        tasks = [
+            asyncio.create_task(self._process_context(context)) for context in contexts
+        ]
+
+        async def batches() -> AsyncIterator[list[dict]]:
+            for next_done in asyncio.as_completed(tasks):
+                _, qa_pairs = await next_done
+                yield qa_pairs
+
+        stream = batches()
+        try:
+            async for qa_pair in self._post_process_stream(stream):
+                yield qa_pair
+        finally:
+            await stream.aclose()
+            for task in tasks:
+                task.cancel()
@@ -1,19 +1,17 @@
-from .config import qa_generation_service_settings
 from .models import ChatSession
 
 
 def build_contexts(chat_sessions: list[ChatSession]) -> list[str]:
-    """从 chat_sessions 构建 context 列表"""
-    contexts = []
-    for chat_session in chat_sessions:
-        messages = chat_session["messages"]
-        context = "\n".join(
-            [
-                f"{idx + 1}. {message["role"]}: {message["content"]}"
-                for idx, message in enumerate(messages)
-            ]
+    """从 chat_sessions 构建 context 列表，长度截断由生成器在调用模型前完成
+
+    完全相同的会话只保留首次出现的一份，避免重复调用模型
+    """
+    return list(
+        dict.fromkeys(
+            "\n".join(
+                "%d. %s: %s" % (idx, message["role"], message["content"])
+                for idx, message in enumerate(chat_session["messages"], 1)
+            )
+            for chat_session in chat_sessions
         )
-        if len(context) > qa_generation_service_settings.max_context_length:
-            context = context[: qa_generation_service_settings.max_context_length]
-        contexts.append(context)
-    return contexts
+    )
@@ -10,5 +10,6 @@ if __name__ == "__main__":
         workers=settings.workers,
         reload=settings.debug,
         log_level=settings.log_level.lower(),
+        loop="uvloop",
         factory=True,
     )
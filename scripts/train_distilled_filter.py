@@ -0,0 +1,93 @@
+"""训练 DistilledFilter 权重
+
+以 LLMFilter 的过滤结果为标注，在归一化句向量上训练逻辑回归分类器，离线执行。
+样本文件每行为 {"qa_pair": {...}, "keep": true/false}，也可直接使用 LLMFilter
+开启 DEBUG 日志后输出的 "LLMFilter sample: {...}" 日志行。
+
+用法:
+    uv run python -m scripts.train_distilled_filter samples.jsonl weights.npz
+"""
+
+import argparse
+import logging
+
+import numpy as np
+import orjson
+from sentence_transformers import SentenceTransformer
+
+from app.config import settings
+from app.services.qa_generation.filters import DistilledFilter
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_LOG_MARKER = " sample: "
+
+
+def load_samples(path: str) -> list[dict]:
+    """读取样本文件，兼容 JSONL 与 LLMFilter 样本日志行"""
+    samples = []
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            _, marker, payload = line.partition(SAMPLE_LOG_MARKER.encode())
+            samples.append(orjson.loads(payload if marker else line))
+    return samples
+
+
+def train(
+    sentence_transformer: SentenceTransformer,
+    samples: list[dict],
+    epochs: int = 500,
+    learning_rate: float = 0.5,
+    l2: float = 1e-4,
+) -> tuple[np.ndarray, float]:
+    """全量梯度下降训练逻辑回归，返回权重与偏置
+
+    Args:
+        sentence_transformer: 句向量模型，需与线上一致
+        samples: {"qa_pair": ..., "keep": ...} 样本
+        epochs: 全量梯度下降轮数
+        learning_rate: 学习率
+        l2: L2 正则系数
+    """
+    features = sentence_transformer.encode(
+        DistilledFilter._texts([sample["qa_pair"] for sample in samples]),
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+    ).astype(np.float64)
+    labels = np.array([bool(sample["keep"]) for sample in samples], np.float64)
+
+    weight = np.zeros(features.shape[1])
+    bias = 0.0
+    for _ in range(epochs):
+        errors = 1.0 / (1.0 + np.exp(-(features @ weight + bias))) - labels
+        weight -= learning_rate * (features.T @ errors / len(labels) + l2 * weight)
+        bias -= learning_rate * errors.mean()
+    return weight, bias
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="训练 DistilledFilter 权重")
+    parser.add_argument("samples", help="样本文件路径")
+    parser.add_argument("output", help="权重保存路径(.npz)")
+    parser.add_argument("--epochs", type=int, default=500, help="梯度下降轮数")
+    parser.add_argument("--learning-rate", type=float, default=0.5, help="学习率")
+    parser.add_argument("--l2", type=float, default=1e-4, help="L2 正则系数")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    samples = load_samples(args.samples)
+    logger.info("Loaded %d samples from %s", len(samples), args.samples)
+
+    sentence_transformer = SentenceTransformer(settings.sentence_transformer_model)
+    weight, bias = train(
+        sentence_transformer, samples, args.epochs, args.learning_rate, args.l2
+    )
+    np.savez(args.output, weight=weight, bias=bias)
+    logger.info("Saved weights to %s", args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""训练 MLChecker 权重
+
+以 LLMChecker 的策略判断为标注，在归一化句向量上训练 softmax 回归分类头，离线执行。
+样本文件每行为 {"question": ..., "answer": ..., "strategy": ...}，也可直接使用
+LLMChecker 开启 DEBUG 日志后输出的 "LLMChecker sample: {...}" 日志行。
+
+用法:
+    uv run python -m scripts.train_ml_checker samples.jsonl weights.npz
+"""
+
+import argparse
+import logging
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from app.config import settings
+from app.services.answer_enhancement.checkers import MLChecker
+from app.services.answer_enhancement.enum import EnhancementStrategy
+from scripts.train_distilled_filter import load_samples
+
+logger = logging.getLogger(__name__)
+
+
+def train(
+    sentence_transformer: SentenceTransformer,
+    samples: list[dict],
+    epochs: int = 500,
+    learning_rate: float = 0.5,
+    l2: float = 1e-4,
+) -> dict[str, np.ndarray]:
+    """全量梯度下降训练 softmax 回归，返回 MLChecker 权重文件内容
+
+    Args:
+        sentence_transformer: 句向量模型，需与线上一致
+        samples: {"question": ..., "answer": ..., "strategy": ...} 样本
+        epochs: 全量梯度下降轮数
+        learning_rate: 学习率
+        l2: L2 正则系数
+    """
+    texts, strategies = [], []
+    for sample in samples:
+        try:
+            strategy = EnhancementStrategy.get_strategy(sample["strategy"])
+        except ValueError:
+            logger.warning("Skip sample with invalid strategy: %s", sample["strategy"])
+            continue
+        texts.append(MLChecker._text(sample["question"], sample["answer"]))
+        strategies.append(strategy.name)
+
+    classes = sorted(set(strategies))
+    labels = np.array([classes.index(strategy) for strategy in strategies])
+    targets = np.eye(len(classes))[labels]
+
+    features = sentence_transformer.encode(
+        texts, convert_to_numpy=True, normalize_embeddings=True
+    ).astype(np.float64)
+
+    coef = np.zeros((len(classes), features.shape[1]))
+    intercept = np.zeros(len(classes))
+    for _ in range(epochs):
+        logits = features @ coef.T + intercept
+        probabilities = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        errors = probabilities - targets
+        coef -= learning_rate * (errors.T @ features / len(labels) + l2 * coef)
+        intercept -= learning_rate * errors.mean(axis=0)
+    return {"coef": coef, "intercept": intercept, "classes": np.array(classes)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="训练 MLChecker 权重")
+    parser.add_argument("samples", help="样本文件路径")
+    parser.add_argument("output", help="权重保存路径(.npz)")
+    parser.add_argument("--epochs", type=int, default=500, help="梯度下降轮数")
+    parser.add_argument("--learning-rate", type=float, default=0.5, help="学习率")
+    parser.add_argument("--l2", type=float, default=1e-4, help="L2 正则系数")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    samples = load_samples(args.samples)
+    logger.info("Loaded %d samples from %s", len(samples), args.samples)
+
+    sentence_transformer = SentenceTransformer(settings.sentence_transformer_model)
+    weights = train(
+        sentence_transformer, samples, args.epochs, args.learning_rate, args.l2
+    )
+    np.savez(args.output, **weights)
+    logger.info("Saved weights to %s", args.output)
+
+
+if __name__ == "__main__":
+    main()
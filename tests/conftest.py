@@ -1,9 +1,10 @@
 """pytest 公共配置与 fixture"""
 
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
 
-from main import app
+from app.app import create_app
 
 
 @pytest.fixture(scope="session")
@@ -11,5 +12,24 @@ def client() -> TestClient:
     """
     使用上下文管理器以触发 lifespan，确保 app.state 正确初始化。
     """
-    with TestClient(app) as client:
+    with TestClient(create_app()) as client:
         yield client
+
+
+class VectorEncoder:
+    """按预设向量编码文本，接口与 SentenceTransformer.encode 兼容"""
+
+    def __init__(self, vectors: dict[str, list[float]]):
+        self.vectors = vectors
+
+    def encode(self, texts, normalize_embeddings=False, **kwargs):
+        embeddings = np.array([self.vectors[text] for text in texts], np.float32)
+        if normalize_embeddings:
+            embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings
+
+
+@pytest.fixture
+def vector_encoder() -> type[VectorEncoder]:
+    """按预设向量构造编码器：vector_encoder({"文本": [1.0, 0.0]})"""
+    return VectorEncoder
@@ -0,0 +1,110 @@
+"""缓存工具单元测试"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.core.caches import LRUCache, SemanticCache
+
+
+def test_lru_cache_get_and_set():
+    """未命中返回默认值，命中返回写入值"""
+    cache = LRUCache(2)
+    assert cache.get("a") is None
+    assert cache.get("a", "default") == "default"
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert len(cache) == 1
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """超出容量时淘汰最久未使用的条目，读取会刷新使用顺序"""
+    cache = LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_lru_cache_overwrite_does_not_grow():
+    """覆盖已有键不增加条目数"""
+    cache = LRUCache(2)
+    cache.set("a", 1)
+    cache.set("a", 2)
+    assert len(cache) == 1
+    assert cache.get("a") == 2
+
+
+def test_lru_cache_disabled():
+    """容量不大于 0 时不缓存"""
+    cache = LRUCache(0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+@pytest.fixture
+def semantic_cache(vector_encoder):
+    """按参数构造使用预设向量的语义缓存"""
+    encoder = vector_encoder(
+        {
+            "防水吗": [1.0, 0.0, 0.0],
+            "防水么": [0.99, 0.1, 0.0],
+            "多少钱": [0.0, 1.0, 0.0],
+            "颜色": [0.0, 0.0, 1.0],
+        }
+    )
+    return lambda **kwargs: SemanticCache(encoder, **kwargs)
+
+
+def _embed(cache: SemanticCache, text: str) -> np.ndarray:
+    return asyncio.run(cache.embed(text))
+
+
+def test_semantic_cache_hits_similar_text(semantic_cache):
+    """相似度不低于阈值即命中，否则返回默认值"""
+    cache = semantic_cache(threshold=0.95)
+    assert cache.get(_embed(cache, "防水吗")) is None
+
+    cache.set(_embed(cache, "防水吗"), "支持")
+    assert cache.get(_embed(cache, "防水么")) == "支持"
+    assert cache.get(_embed(cache, "多少钱"), "miss") == "miss"
+
+
+def test_semantic_cache_returns_most_similar(semantic_cache):
+    """多个条目时返回最相似的条目"""
+    cache = semantic_cache(threshold=0.5)
+    cache.set(_embed(cache, "多少钱"), "价格")
+    cache.set(_embed(cache, "防水吗"), "防水")
+    assert cache.get(_embed(cache, "防水么")) == "防水"
+
+
+def test_semantic_cache_expired_entries_miss(semantic_cache):
+    """过期条目不命中"""
+    cache = semantic_cache(ttl=-1)
+    cache.set(_embed(cache, "防水吗"), "支持")
+    assert cache.get(_embed(cache, "防水吗")) is None
+
+
+def test_semantic_cache_overwrites_oldest_when_full(semantic_cache):
+    """容量满后覆盖最旧的条目"""
+    cache = semantic_cache(capacity=2)
+    cache.set(_embed(cache, "防水吗"), "防水")
+    cache.set(_embed(cache, "多少钱"), "价格")
+    cache.set(_embed(cache, "颜色"), "颜色")
+    assert len(cache) == 2
+    assert cache.get(_embed(cache, "防水吗")) is None
+    assert cache.get(_embed(cache, "多少钱")) == "价格"
+    assert cache.get(_embed(cache, "颜色")) == "颜色"
+
+
+def test_semantic_cache_disabled(semantic_cache):
+    """容量不大于 0 时不缓存"""
+    cache = semantic_cache(capacity=0)
+    cache.set(_embed(cache, "防水吗"), "支持")
+    assert len(cache) == 0
+    assert cache.get(_embed(cache, "防水吗")) is None
@@ -0,0 +1,54 @@
+"""策略检查器单元测试"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services.answer_enhancement.checkers import MLChecker
+from scripts.train_ml_checker import train
+
+VECTORS = {
+    "拍照怎么样?\n[实拍图]": [1.0, 0.0],
+    "续航怎么样?\n可以用一天。": [0.0, 1.0],
+    "你好\n你好": [1.0, 1.0],
+}
+
+
+@pytest.fixture
+def encoder(vector_encoder):
+    return vector_encoder(VECTORS)
+
+
+def test_ml_checker_returns_confident_strategy(tmp_path, encoder):
+    """置信度足够时返回策略名称，否则返回空字符串交给后续检查器"""
+    weights_path = tmp_path / "weights.npz"
+    np.savez(
+        weights_path,
+        coef=np.array([[10.0, 0.0], [0.0, 10.0]]),
+        intercept=np.zeros(2),
+        classes=np.array(["GUIDANCE", "ENHANCE"]),
+    )
+    checker = MLChecker(encoder, str(weights_path), threshold=0.9)
+
+    assert asyncio.run(checker.check("拍照怎么样?", "[实拍图]")) == "GUIDANCE"
+    assert asyncio.run(checker.check("续航怎么样?", "可以用一天。")) == "ENHANCE"
+    assert asyncio.run(checker.check("你好", "你好")) == ""
+
+
+def test_train_ml_checker_weights_load(tmp_path, encoder):
+    """训练脚本输出的权重文件可直接被 MLChecker 加载，无效策略的样本被跳过"""
+    samples = [
+        {"question": "拍照怎么样?", "answer": "[实拍图]", "strategy": "GUIDANCE"},
+        {"question": "续航怎么样?", "answer": "可以用一天。", "strategy": "enhance"},
+        {"question": "你好", "answer": "你好", "strategy": "UNKNOWN"},
+    ]
+    weights = train(encoder, samples, epochs=200, learning_rate=5.0)
+    assert list(weights["classes"]) == ["ENHANCE", "GUIDANCE"]
+
+    weights_path = tmp_path / "weights.npz"
+    np.savez(weights_path, **weights)
+    checker = MLChecker(encoder, str(weights_path), threshold=0.9)
+
+    assert asyncio.run(checker.check("拍照怎么样?", "[实拍图]")) == "GUIDANCE"
+    assert asyncio.run(checker.check("续航怎么样?", "可以用一天。")) == "ENHANCE"
@@ -0,0 +1,84 @@
+"""数据库引擎参数单元测试"""
+
+import asyncio
+
+import orjson
+import pytest
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base, Job, _engine_options
+from app.core.enum import JobType
+
+RESULT = {"total": 1, "qas": [{"question": "防水吗?", "answer": "支持"}]}
+SEED_ROWS = (("new", RESULT), ("empty", {}), ("legacy", None))
+
+
+@pytest.mark.parametrize(
+    "database_url",
+    [
+        "sqlite+aiosqlite:///:memory:",
+        "sqlite+aiosqlite://",
+        "sqlite+aiosqlite:///file:jobs?mode=memory&uri=true",
+    ],
+)
+def test_memory_sqlite_has_no_pool_sizing(database_url):
+    """内存 SQLite 使用 StaticPool，不传连接池大小参数，引擎可正常创建"""
+    options = _engine_options(database_url)
+    assert options["poolclass"] is StaticPool
+    assert "pool_size" not in options
+    assert "max_overflow" not in options
+    create_async_engine(database_url, **options)
+
+
+def test_file_sqlite_has_pool_sizing():
+    """文件 SQLite 使用队列连接池，保留连接池大小参数"""
+    database_url = "sqlite+aiosqlite:///db.sqlite3"
+    options = _engine_options(database_url)
+    assert "pool_size" in options
+    assert "max_overflow" in options
+    assert options["connect_args"] == {"check_same_thread": False}
+    create_async_engine(database_url, **options)
+
+
+def test_postgresql_has_pool_sizing():
+    """PostgreSQL 保留连接池大小与回收参数"""
+    options = _engine_options("postgresql+psycopg://user@localhost/jobs")
+    assert "pool_size" in options
+    assert options["pool_use_lifo"] is True
+    assert options["connect_args"] == {"prepare_threshold": 1}
+
+
+def test_orjson_column_round_trip_and_legacy_rows():
+    """JSON 列单次编码读写，旧版本二次编码的数据仍可读取"""
+    database_url = "sqlite+aiosqlite:///:memory:"
+
+    async def run() -> dict[str, dict | None]:
+        engine = create_async_engine(database_url, **_engine_options(database_url))
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(
+                insert(Job),
+                [
+                    {"job_id": job_id, "job_type": JobType.QA_GENERATION, "result": result}
+                    for job_id, result in SEED_ROWS
+                ],
+            )
+            # 旧版本先以 orjson 序列化为字符串，再由 JSON 类型编码一次
+            await conn.execute(
+                text("UPDATE jobs SET result = :result WHERE job_id = 'legacy'"),
+                {"result": orjson.dumps(orjson.dumps(RESULT).decode()).decode()},
+            )
+            stored = await conn.scalar(
+                text("SELECT result FROM jobs WHERE job_id = 'new'")
+            )
+            assert orjson.loads(stored) == RESULT
+
+        async with engine.connect() as conn:
+            rows = await conn.execute(select(Job.job_id, Job.result))
+            results = {job_id: result for job_id, result in rows}
+        await engine.dispose()
+        return results
+
+    assert asyncio.run(run()) == {"new": RESULT, "empty": None, "legacy": RESULT}
@@ -0,0 +1,39 @@
+"""内容抽取器解析单元测试"""
+
+import pytest
+
+from app.services.answer_enhancement.extractors import _extract_description
+
+
+@pytest.mark.parametrize(
+    ("content", "expected"),
+    [
+        ('{"description": "实拍样张", "reason": "r"}', "实拍样张"),
+        ('{"reason": "r",\n  "description" :  "视频"}', "视频"),
+        ('{"description": ""}', ""),
+        ('{"description": null}', ""),
+        ('{"description":null,"reason":"r"}', ""),
+        ('{"description": null\n}', ""),
+        (r'{"description": "a\"b\\n"}', 'a"b\\n'),
+        (r'{"description": "\u5b9e\u62cd"}', "实拍"),
+    ],
+)
+def test_extract_description(content, expected):
+    """字符串与 null 取值"""
+    assert _extract_description(content) == expected
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        '{"reason": "r"}',
+        '{"description" "x"}',
+        '{"description": 1}',
+        '{"description": nullx}',
+        '{"description": null',
+        '{"description": "未闭合',
+    ],
+)
+def test_extract_description_rejects(content):
+    """非常见结构或非法字面量返回 None，由调用方完整解析"""
+    assert _extract_description(content) is None
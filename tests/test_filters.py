@@ -0,0 +1,148 @@
+"""QA 过滤器单元测试"""
+
+import asyncio
+import re
+
+import numpy as np
+import pytest
+
+from app.services.qa_generation.filters import DistilledFilter, RuleFilter
+
+
+def _qa(question: str, answer: str = "答案", intent: str = "产品&功能咨询") -> dict:
+    return {"question": question, "answer": answer, "intent": intent}
+
+
+def test_all_rules_must_match():
+    """所有规则为与关系，同一字段的多个条件合并后仍需全部满足"""
+    rule_filter = RuleFilter(
+        [
+            {"question_condition": "VERTU"},
+            {"question_condition": "防水", "intent_condition": "功能"},
+        ]
+    )
+    assert rule_filter.filter(_qa("vertu 手机防水吗"))
+    assert not rule_filter.filter(_qa("VERTU 手机多少钱"))
+    assert not rule_filter.filter(_qa("VERTU 防水吗", intent="价格&优惠咨询"))
+
+
+def test_condition_is_search_and_ignores_case():
+    """合并后的条件与 re.search 语义一致：任意位置匹配、忽略大小写"""
+    rule_filter = RuleFilter([{"question_condition": "quantum"}])
+    assert rule_filter.filter(_qa("请问 VERTU QUANTUM 防水吗"))
+
+
+def test_anchored_condition():
+    """^ 锚点针对字段开头"""
+    rule_filter = RuleFilter([{"answer_condition": r"^(?!.*(https?://|www\.))"}])
+    assert rule_filter.filter(_qa("问题", answer="支持防水"))
+    assert not rule_filter.filter(_qa("问题", answer="详见 www.vertu.com"))
+
+
+def test_empty_condition_is_ignored():
+    """空条件不参与过滤"""
+    rule_filter = RuleFilter([{"question_condition": "", "answer_condition": ""}])
+    assert rule_filter.filter(_qa("任意问题"))
+
+
+def test_backreference_condition():
+    """含反向引用的条件单独编译"""
+    rule_filter = RuleFilter(
+        [{"question_condition": r"(\w)\1"}, {"question_condition": "VERTU"}]
+    )
+    assert rule_filter.filter(_qa("VERTU aa"))
+    assert not rule_filter.filter(_qa("VERTU ab"))
+
+
+def test_inline_global_flags_fall_back_to_separate_patterns():
+    """内联全局标志无法合并，回退为逐条编译而不是报错"""
+    rule_filter = RuleFilter(
+        [{"question_condition": "(?i)vertu"}, {"question_condition": "防水"}]
+    )
+    assert rule_filter.filter(_qa("VERTU 防水吗"))
+    assert not rule_filter.filter(_qa("VERTU 多少钱"))
+
+
+def test_repeated_group_names_fall_back_to_separate_patterns():
+    """不同规则中同名分组无法合并，回退为逐条编译而不是报错"""
+    rule_filter = RuleFilter(
+        [
+            {"question_condition": "(?P<model>VERTU)"},
+            {"question_condition": "(?P<model>防水)"},
+        ]
+    )
+    assert rule_filter.filter(_qa("VERTU 防水吗"))
+    assert not rule_filter.filter(_qa("VERTU 多少钱"))
+
+
+def test_invalid_pattern_raises():
+    """非法正则仍在构造时报错"""
+    with pytest.raises(re.error):
+        RuleFilter([{"question_condition": "("}])
+
+
+@pytest.mark.parametrize(
+    "rules",
+    [
+        [{"question_condition": "VERTU"}, {"answer_condition": "^支持"}],
+        [{"question_condition": "(?i)vertu"}, {"question_condition": "防水"}],
+    ],
+)
+def test_filter_batch_matches_filter(rules):
+    """按列批量过滤与逐个过滤结果一致"""
+    qas = [
+        _qa("VERTU 防水吗", answer="支持"),
+        _qa("VERTU 多少钱", answer="不支持"),
+        _qa("其他问题", answer="支持"),
+    ]
+    rule_filter = RuleFilter(rules)
+    columns = {
+        field: [qa[field] for qa in qas] for field in ("question", "answer", "intent")
+    }
+    np.testing.assert_array_equal(
+        rule_filter.filter_batch(columns), [rule_filter.filter(qa) for qa in qas]
+    )
+
+
+class RecordingFilter:
+    """记录调用的回退过滤器"""
+
+    def __init__(self, keep: bool):
+        self.keep = keep
+        self.calls: list[dict] = []
+
+    async def filter(self, qa_pair: dict) -> bool:
+        self.calls.append(qa_pair)
+        return self.keep
+
+
+@pytest.fixture
+def distilled_filter(tmp_path, vector_encoder):
+    """第一维为保留方向的分类器：[1, 0] 保留、[-1, 0] 丢弃、[0, 1] 不确定"""
+    weights_path = tmp_path / "weights.npz"
+    np.savez(weights_path, weight=np.array([10.0, 0.0]), bias=0.0)
+    encoder = vector_encoder(
+        {
+            "VERTU 防水吗 答案": [1.0, 0.0],
+            "多少钱 答案": [-1.0, 0.0],
+            "你好 答案": [0.0, 1.0],
+        }
+    )
+    return DistilledFilter(encoder, str(weights_path), RecordingFilter(False), 0.9)
+
+
+def test_distilled_filter_predict_batch(distilled_filter):
+    """置信度足够时直接判定，否则为 None"""
+    qas = [_qa("VERTU 防水吗"), _qa("多少钱"), _qa("你好")]
+    assert asyncio.run(distilled_filter.predict_batch(qas)) == [True, False, None]
+    assert asyncio.run(distilled_filter.predict_batch([])) == []
+
+
+def test_distilled_filter_falls_back_when_uncertain(distilled_filter):
+    """只有不确定的QA对交给回退过滤器"""
+    assert asyncio.run(distilled_filter.filter(_qa("VERTU 防水吗")))
+    assert not asyncio.run(distilled_filter.filter(_qa("多少钱")))
+    assert distilled_filter.fallback.calls == []
+
+    assert not asyncio.run(distilled_filter.filter(_qa("你好")))
+    assert distilled_filter.fallback.calls == [_qa("你好")]
@@ -0,0 +1,68 @@
+"""流式输出解析工具单元测试"""
+
+import pytest
+
+from app.core.parsers import JSONArrayScanner, JSONObjectScanner
+
+
+def _feed_object(text: str, step: int) -> str | None:
+    scanner = JSONObjectScanner()
+    for index in range(0, len(text), step):
+        if (content := scanner.feed(text[index : index + step])) is not None:
+            return content
+    return None
+
+
+def _feed_array(text: str, step: int) -> list[str]:
+    scanner = JSONArrayScanner()
+    elements = []
+    for index in range(0, len(text), step):
+        elements.extend(scanner.feed(text[index : index + step]))
+    return elements
+
+
+@pytest.mark.parametrize("step", [1, 3, 1000])
+def test_object_scanner_returns_first_object(step):
+    """首个顶层对象闭合即返回，忽略前后说明文字"""
+    text = '说明 "引号" ```json\n{"a": "}{", "b": {"c": [1]}}\n``` {"d": 1}'
+    assert _feed_object(text, step) == '{"a": "}{", "b": {"c": [1]}}'
+
+
+def test_object_scanner_handles_escaped_quotes():
+    """字符串中的转义引号与反斜杠不影响扫描"""
+    text = r'{"a": "x\"}", "b": "\\"}'
+    assert _feed_object(text, 2) == text
+
+
+def test_object_scanner_incomplete():
+    """对象未闭合时返回 None，已接收文本保存在 text 中"""
+    scanner = JSONObjectScanner()
+    assert scanner.feed('{"a": 1') is None
+    assert scanner.text == '{"a": 1'
+
+
+@pytest.mark.parametrize("step", [1, 4, 1000])
+def test_array_scanner_returns_elements(step):
+    """数组元素逐个闭合即返回，嵌套结构与字符串中的括号不影响扫描"""
+    text = '[{"q": "a]}\\"", "n": {"x": [1, {"y": 2}]}}, {"q": "b"}] [{"q": "c"}]'
+    assert _feed_array(text, step) == [
+        '{"q": "a]}\\"", "n": {"x": [1, {"y": 2}]}}',
+        '{"q": "b"}',
+    ]
+
+
+@pytest.mark.parametrize("step", [1, 5, 1000])
+def test_array_scanner_skips_brackets_before_array(step):
+    """数组之前含方括号的说明文字被忽略"""
+    text = 'Here are the pairs [note] [1, 2] []: [ \n {"q": "a"}]'
+    assert _feed_array(text, step) == ['{"q": "a"}']
+
+
+def test_array_scanner_keeps_closed_elements_of_truncated_output():
+    """输出被截断时保留已闭合的元素"""
+    assert _feed_array('```json\n[{"q": "a"}, {"q": "tru', 3) == ['{"q": "a"}']
+
+
+def test_array_scanner_empty_array():
+    """空数组没有元素"""
+    assert _feed_array("[]", 1) == []
@@ -0,0 +1,107 @@
+"""QA 后处理器单元测试"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services.qa_generation.processors import (
+    SemanticProcessor,
+    _greedy_duplicates,
+    _greedy_duplicates_numpy,
+    _greedy_duplicates_scalar,
+)
+
+GREEDY_IMPLEMENTATIONS = [
+    _greedy_duplicates,
+    _greedy_duplicates_numpy,
+    _greedy_duplicates_scalar,
+]
+
+
+@pytest.mark.parametrize("greedy_duplicates", GREEDY_IMPLEMENTATIONS)
+def test_greedy_duplicates_keeps_first_of_each_group(greedy_duplicates):
+    """保留的问答对将其后相似度大于阈值的问答对标记为重复"""
+    similarities = np.array(
+        [
+            [1.0, 0.95, 0.1],
+            [0.95, 1.0, 0.1],
+            [0.1, 0.1, 1.0],
+        ]
+    )
+    duplicated = greedy_duplicates(similarities, 0.9, np.zeros(3, dtype=bool))
+    assert duplicated.tolist() == [False, True, False]
+
+
+@pytest.mark.parametrize("greedy_duplicates", GREEDY_IMPLEMENTATIONS)
+def test_greedy_duplicates_ignores_removed_rows(greedy_duplicates):
+    """已标记为重复的问答对不再标记其后的问答对"""
+    # 0 与 1 相似，1 与 2 相似，0 与 2 不相似：1 被移除后 2 应保留
+    similarities = np.array(
+        [
+            [1.0, 0.95, 0.5],
+            [0.95, 1.0, 0.95],
+            [0.5, 0.95, 1.0],
+        ]
+    )
+    duplicated = greedy_duplicates(similarities, 0.9, np.zeros(3, dtype=bool))
+    assert duplicated.tolist() == [False, True, False]
+
+
+@pytest.mark.parametrize("greedy_duplicates", GREEDY_IMPLEMENTATIONS)
+def test_greedy_duplicates_respects_initial_marks(greedy_duplicates):
+    """预先标记为重复的问答对不参与标记"""
+    similarities = np.array([[1.0, 0.95], [0.95, 1.0]])
+    duplicated = greedy_duplicates(similarities, 0.9, np.array([True, False]))
+    assert duplicated.tolist() == [True, False]
+
+
+def test_greedy_duplicates_implementations_agree():
+    """各实现在随机输入上结果一致"""
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(64, 8))
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    similarities = np.ascontiguousarray(embeddings @ embeddings.T)
+    expected = _greedy_duplicates_scalar(similarities, 0.5, np.zeros(64, dtype=bool))
+    for greedy_duplicates in GREEDY_IMPLEMENTATIONS:
+        duplicated = greedy_duplicates(similarities, 0.5, np.zeros(64, dtype=bool))
+        np.testing.assert_array_equal(duplicated, expected)
+
+
+def _qa(question: str) -> dict:
+    return {"question": question, "answer": "答案", "intent": "产品&功能咨询"}
+
+
+@pytest.fixture
+def processor(vector_encoder) -> SemanticProcessor:
+    return SemanticProcessor(
+        vector_encoder(
+            {
+                "防水吗": [1.0, 0.0],
+                "防水么": [0.99, 0.1],
+                "多少钱": [0.0, 1.0],
+            }
+        ),
+        semantic_threshold=0.9,
+    )
+
+
+def test_semantic_processor_process(processor):
+    """移除与之前保留的问答对相似的问答对，保持原顺序"""
+    qas = [_qa("防水吗"), _qa("多少钱"), _qa("防水么")]
+    assert asyncio.run(processor.process(qas)) == [_qa("防水吗"), _qa("多少钱")]
+    assert asyncio.run(processor.process([])) == []
+
+
+def test_semantic_processor_process_stream(processor):
+    """增量去重时与之前批次保留的问答对比较"""
+
+    async def batches():
+        yield [_qa("防水吗")]
+        yield []
+        yield [_qa("防水么"), _qa("多少钱")]
+
+    async def collect() -> list[dict]:
+        return [qa async for qa in processor.process_stream(batches())]
+
+    assert asyncio.run(collect()) == [_qa("防水吗"), _qa("多少钱")]
@@ -0,0 +1,73 @@
+"""有界并发执行工具单元测试"""
+
+import asyncio
+
+import pytest
+
+from app.core.workers import map_with_workers
+
+
+def test_results_keep_input_order():
+    """结果顺序与输入一致，与完成顺序无关"""
+
+    async def work(item: int) -> int:
+        await asyncio.sleep(0.001 * (5 - item % 5))
+        return item * 2
+
+    results = asyncio.run(map_with_workers(work, list(range(20)), 4))
+    assert results == [item * 2 for item in range(20)]
+
+
+def test_concurrency_is_bounded():
+    """任意时刻执行中的调用不超过 worker 数"""
+    running = peak = 0
+
+    async def work(item: int) -> int:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.001)
+        running -= 1
+        return item
+
+    asyncio.run(map_with_workers(work, list(range(30)), 3))
+    assert peak == 3
+
+
+def test_empty_items():
+    """空输入直接返回空列表"""
+
+    async def work(item: int) -> int:
+        raise AssertionError("should not be called")
+
+    assert asyncio.run(map_with_workers(work, [], 4)) == []
+
+
+def test_on_done_reports_progress():
+    """每完成一个元素回调一次已完成数量"""
+    progress = []
+
+    async def work(item: int) -> int:
+        return item
+
+    async def on_done(done: int) -> None:
+        progress.append(done)
+
+    asyncio.run(map_with_workers(work, list(range(5)), 2, on_done))
+    assert progress == [1, 2, 3, 4, 5]
+
+
+def test_exception_propagates_and_cancels_remaining():
+    """任一调用失败时抛出原异常类型，并取消其余调用"""
+    started = []
+
+    async def work(item: int) -> int:
+        started.append(item)
+        if item == 2:
+            raise ValueError("boom")
+        await asyncio.sleep(1)
+        return item
+
+    with pytest.raises(ValueError, match="boom"):
+        asyncio.run(map_with_workers(work, list(range(100)), 4))
+    assert len(started) < 100